@@ -1,3 +1,5 @@
+from typing import Optional
+
 from src.tools.news_search_tools import NewsSearchTool
 
 class NewsSearchAgent:
@@ -8,17 +10,18 @@ class NewsSearchAgent:
     def __init__(self):
         self.news_tool = NewsSearchTool()
 
-    def run(self, max_results: int = 5) -> dict:
+    def run(self, max_results: int = 5, deadline: Optional[float] = None) -> dict:
         """
         Searches for news and returns a list of articles.
+        The search stops at `deadline` (a time.time() value) if it comes first.
         """
-        articles = self.news_tool.search_srag_news(max_results=max_results)
+        articles = self.news_tool.search_srag_news(max_results=max_results, deadline=deadline)
         return {"articles": articles}
 
 
-def run_news_search_agent(max_results: int = 5) -> dict:
+def run_news_search_agent(max_results: int = 5, deadline: Optional[float] = None) -> dict:
     """
     Runs the news search agent and returns the results.
     """
     agent = NewsSearchAgent()
-    return agent.run(max_results=max_results)
+    return agent.run(max_results=max_results, deadline=deadline)
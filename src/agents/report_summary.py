@@ -1,11 +1,11 @@
 from src.tools.report_summary_tools import (
-    generate_summary_metrics,
-    generate_summary_charts,
+    generate_section_summaries,
     generate_executive_summary
 )
 import json
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 class ReportSummaryAgent:
     """
@@ -15,14 +15,16 @@ class ReportSummaryAgent:
     def __init__(self):
         pass
 
-    def run(self, metrics: dict, news_analysis: dict, charts: dict, save_json: bool = False) -> dict:
+    def run(self, metrics: dict, news_analysis: dict, charts: dict, save_json: bool = False,
+            deadline: Optional[float] = None) -> dict:
         """
         Generates summary_metrics, summary_charts, and executive_summary.
+        LLM calls are capped to the time left before `deadline` (a time.time() value);
+        once it is reached the summaries fall back to their plain-text versions.
         If save_json=True, saves the report in resources/json/srag_report_<date>.json
         """
-        summary_metrics = generate_summary_metrics(metrics, news_analysis)
-        summary_charts = generate_summary_charts(news_analysis, charts)
-        executive_summary = generate_executive_summary(summary_metrics, summary_charts)
+        summary_metrics, summary_charts = generate_section_summaries(metrics, news_analysis, charts, deadline)
+        executive_summary = generate_executive_summary(summary_metrics, summary_charts, deadline)
         report = {
             "report_metadata": {
                 "generation_date": datetime.now().isoformat(),
@@ -54,10 +56,11 @@ def save_report_json(report: dict) -> str:
     return str(report_path)
 
 
-def run_report_summary_agent(metrics: dict, news_analysis: dict, charts: dict, save_json: bool = False) -> dict:
+def run_report_summary_agent(metrics: dict, news_analysis: dict, charts: dict, save_json: bool = False,
+                             deadline: Optional[float] = None) -> dict:
     """
     Runs the report summary agent and returns the results.
     If save_json=True, saves the report in resources/json/.
     """
     agent = ReportSummaryAgent()
-    return agent.run(metrics, news_analysis, charts, save_json=save_json)
+    return agent.run(metrics, news_analysis, charts, save_json=save_json, deadline=deadline)
@@ -1,3 +1,4 @@
+from src.data_loader import SQLITE_DB
 from src.tools.visualization_tools import VisualizationTool
 
 class VisualizationAgent:
@@ -5,22 +6,17 @@ class VisualizationAgent:
     Visualization Agent: generates daily and monthly charts using VisualizationTool.
     Can be used as a node in a LangGraph or standalone.
     """
-    def __init__(self, db_path: str = "src/database.db"):
+    def __init__(self, db_path: str = SQLITE_DB):
         self.visualization_tool = VisualizationTool(db_path)
 
     def run(self, days: int = 30, months: int = 12) -> dict:
         """
         Generates the main charts and returns a dictionary with the results.
         """
-        daily_chart = self.visualization_tool.create_daily_cases_chart(days=days)
-        monthly_chart = self.visualization_tool.create_monthly_cases_chart(months=months)
-        return {
-            "daily_cases_chart": daily_chart,
-            "monthly_cases_chart": monthly_chart
-        }
+        return self.visualization_tool.create_charts(days=days, months=months)
 
 
-def run_visualization_agent(db_path: str = "src/database.db", days: int = 30, months: int = 12) -> dict:
+def run_visualization_agent(db_path: str = SQLITE_DB, days: int = 30, months: int = 12) -> dict:
     """
     Runs the visualization agent and returns the results.
     """
@@ -1,7 +1,11 @@
+# Execute a partir da raiz do projeto: python -m src.analyze_data
 import pandas as pd
 from sqlalchemy import create_engine, text
 from pathlib import Path
 
+from src.data_loader import PROCESSED_COLUMNS
+from src.utils import columnar_cache
+
 # Caminho para o banco de dados
 db_path = Path(__file__).parent / "database.db"
 
@@ -15,9 +19,14 @@ print(f"Banco encontrado: {db_path}")
 # Cria engine de leitura
 engine = create_engine(f"sqlite:///{db_path}")
 
-# Carregar todos os dados
-print("Carregando dados...")
-df = pd.read_sql("SELECT * FROM srag_table", con=engine)
+# Carregar apenas as colunas analisadas, preferindo o cache colunar (Parquet)
+if columnar_cache.has_data():
+    print("Carregando dados do cache colunar...")
+    df = columnar_cache.read_columns(PROCESSED_COLUMNS)
+else:
+    print("Carregando dados...")
+    colunas = ", ".join(f'"{col}"' for col in PROCESSED_COLUMNS)
+    df = pd.read_sql(f"SELECT {colunas} FROM srag_table", con=engine)
 print(f"Dados carregados: {len(df)} linhas x {len(df.columns)} colunas\n")
 
 # 1. Informações sobre dtypes
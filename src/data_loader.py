@@ -1,11 +1,25 @@
+import io
 import os
 import time
+import sqlite3
 import logging
+import hashlib
+import itertools
 import concurrent.futures
-from typing import List
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+import requests
+
+from src.utils import columnar_cache
+from src.utils.deadline import cap_timeout, is_exhausted
+from src.utils.download import open_source
+from src.utils.worker_context import get_worker_context
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +28,76 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 SQLITE_DB = os.path.join(PROJECT_ROOT, "src", "database.db")
 TABLE_NAME = "srag_table"
+MANIFEST_TABLE = "ingest_manifest"
+DAILY_TABLE = "srag_daily"
+MONTHLY_TABLE = "srag_monthly"
+SOURCE_COLUMN = "SOURCE_FILE"
+
+# Ingestion configuration
+# "stream" appends each processed chunk to SQLite as it is parsed, so peak memory
+# depends on the chunk size; "batch" loads every file fully before saving.
+INGEST_MODE = os.getenv("SRAG_INGEST_MODE", "stream")
+CHUNK_SIZE = int(os.getenv("SRAG_CHUNK_SIZE", "200000"))
+MEMORY_LIMIT_MB = int(os.getenv("SRAG_MEMORY_LIMIT_MB", "256"))
+MIN_CHUNK_SIZE = 5000
+# Worker processes used to parse one local CSV in parallel by byte ranges (1 disables it).
+PARSE_WORKERS = int(os.getenv("SRAG_PARSE_WORKERS", "1"))
+MIN_RANGE_BYTES = 4 * 1024 * 1024
+# Rough ratio between the size of a processed chunk and the transient memory
+# needed to parse, process and write it.
+CHUNK_MEMORY_OVERHEAD = 4
+# Share of the memory ceiling given to SQLite's page cache while loading. A source
+# is written in a single transaction, so its uncommitted pages stay in this cache
+# until it fills and spills them to the database file; chunks get the rest.
+LOAD_CACHE_SHARE = 0.25
+MIN_LOAD_CACHE_MB = 2
+
+# Also keep a Parquet copy of the processed data, partitioned by year, for
+# readers that only need a few columns (requires pyarrow).
+COLUMNAR_CACHE = os.getenv("SRAG_COLUMNAR_CACHE", "1") == "1" and columnar_cache.is_available()
+
+# Bulk SQLite writer configuration
+BULK_BATCH_ROWS = 50000
+# Connection-level settings used only while loading. A load interrupted by an error
+# or a killed process rolls back to the previous rows through the rollback journal.
+# synchronous=NORMAL still syncs at the critical points of each commit, so an OS
+# crash or power loss only leaves the very small chance of corruption that SQLite
+# documents for older filesystems.
+LOAD_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+}
+SQL_COLUMN_TYPES = {
+    'DT_SIN_PRI': 'TEXT',
+    'ANO-SEMANA': 'TEXT',
+    'ANO-MES': 'TEXT',
+    'DT_SIN_PRI_DATETIME': 'TEXT',
+    SOURCE_COLUMN: 'TEXT',
+}
+DATE_COLUMNS = ['DT_SIN_PRI_DATETIME']
+# Indexes created once the data is in, as name -> (table, columns). The metrics
+# and chart queries all read the rollups, so srag_table only needs the source
+# index used to delete a source's rows.
+INDEXES = {
+    "idx_srag_source_file": (TABLE_NAME, f"({SOURCE_COLUMN})"),
+    "idx_srag_daily_date": (DAILY_TABLE, "(DT_SIN_PRI_DATETIME, cases)"),
+    "idx_srag_monthly_month": (MONTHLY_TABLE, "(ANO, MES, cases, deaths, uti_cases, vaccinated)"),
+}
+# Indexes that earlier versions built on srag_table; dropped wherever they remain.
+OBSOLETE_INDEXES = ["idx_srag_month_metrics", "idx_srag_date"]
+
+# Rollups kept in sync with srag_table at ingestion time, one row per source and
+# day (or month). Each measure counts rows, optionally where column == code.
+ROLLUP_MEASURES = {
+    "cases": None,
+    "deaths": ("EVOLUCAO", 2),
+    "uti_cases": ("UTI", 1),
+    "vaccinated": ("VACINA_COV", 1),
+}
+ROLLUP_KEYS = {
+    DAILY_TABLE: ["DT_SIN_PRI_DATETIME"],
+    MONTHLY_TABLE: ["ANO", "MES"],
+}
 
 # Dataset configuration
 COLUMNS = [
@@ -21,6 +105,26 @@ COLUMNS = [
     'VACINA', 'CLASSI_FIN', 'SEM_PRI'
 ]
 
+# Coded columns are carried as unsigned bytes; values outside a column's domain
+# (and missing values) become its fill value: IGNORED_CODE, which means
+# "Ignorado", for the coded columns. SEM_PRI is an epidemiological week, where 9
+# is a real week, so its missing or out-of-range values become MISSING_WEEK.
+IGNORED_CODE = 9
+MISSING_WEEK = 0
+CODE_DOMAINS = {
+    'EVOLUCAO': [1, 2, 3, 9],
+    'UTI': [1, 2, 9],
+    'VACINA_COV': [1, 2, 9],
+    'VACINA': [1, 2, 9],
+    'CLASSI_FIN': [1, 2, 3, 4, 5, 9],
+    'SEM_PRI': list(range(1, 54)),
+}
+CODE_FILL_VALUES = {'SEM_PRI': MISSING_WEEK}
+CODE_DTYPE = 'uint8'
+
+DERIVED_COLUMNS = ['ANO', 'MES', 'ANO-SEMANA', 'ANO-MES', 'DT_SIN_PRI_DATETIME']
+PROCESSED_COLUMNS = COLUMNS + DERIVED_COLUMNS
+
 LOCAL_FILES = [
     "INFLUD25-04-08-2025.csv",
     "INFLUD24-26-06-2025.csv"
@@ -31,60 +135,296 @@ CSV_URLS = [
     "https://s3.sa-east-1.amazonaws.com/ckan.saude.gov.br/SRAG/2024/INFLUD24-26-06-2025.csv"
 ]
 
+# Seconds allowed for the HEAD request that fingerprints a URL.
+FINGERPRINT_TIMEOUT = 10
+
+# Optional SHA-256 per file name, to pin a download to known content. Without one,
+# downloads are checked against the MD5 the server states (see DownloadStream).
+CSV_SHA256 = {}
+
+
+CSV_READ_OPTIONS = {
+    "sep": ';',
+    "usecols": COLUMNS,
+    "encoding": 'latin1',
+    "low_memory": False,
+    # Codes are parsed as Int16 so out-of-range values can be validated before
+    # they are narrowed to CODE_DTYPE.
+    "dtype": {
+        'DT_SIN_PRI': 'string',
+        'EVOLUCAO': 'Int16',
+        'UTI': 'Int16',
+        'VACINA_COV': 'Int16',
+        'VACINA': 'Int16',
+        'CLASSI_FIN': 'Int16',
+        'SEM_PRI': 'Int16'
+    },
+}
+
+
+def _broadcast(values: pd.Series, codes: np.ndarray, index: pd.Index) -> pd.Series:
+    """Expand per-unique values back to one value per row."""
+    return pd.Series(pd.api.extensions.take(values.array, codes, allow_fill=True), index=index)
+
+
+def _broadcast_categorical(values: pd.Series, codes: np.ndarray, index: pd.Index) -> pd.Series:
+    """Expand per-unique values back to one value per row as a categorical column."""
+    value_codes, categories = pd.factorize(values, sort=True)
+    row_codes = pd.api.extensions.take(value_codes, codes, allow_fill=True, fill_value=-1)
+    return pd.Series(pd.Categorical.from_codes(row_codes, categories), index=index)
+
+
+def derive_date_columns(raw_dates: pd.Series) -> pd.DataFrame:
+    """
+    Derive ANO, MES, ANO-SEMANA, ANO-MES and DT_SIN_PRI_DATETIME from DT_SIN_PRI.
+
+    Dates are parsed and formatted once per distinct value, then broadcast back to
+    the rows through factorized codes. Years and months come out as small nullable
+    integers, and the text and date columns as categoricals.
+    """
+    codes, uniques = pd.factorize(raw_dates)
+    dt_temp = pd.to_datetime(pd.Series(uniques), format='%Y-%m-%d', errors='coerce')
+
+    derived = {
+        'ANO': dt_temp.dt.year.astype('UInt16'),
+        'MES': dt_temp.dt.month.astype('UInt8'),
+        'ANO-SEMANA': dt_temp.dt.strftime('%Y') + '-' + dt_temp.dt.isocalendar().week.astype(str).str.zfill(2),
+        'ANO-MES': dt_temp.dt.strftime('%Y-%m'),
+        'DT_SIN_PRI_DATETIME': dt_temp,
+    }
+    return pd.DataFrame({
+        col: (_broadcast(values, codes, raw_dates.index) if col in ('ANO', 'MES')
+              else _broadcast_categorical(values, codes, raw_dates.index))
+        for col, values in derived.items()
+    })
+
+
+def encode_code_column(values: pd.Series, domain: List[int], fill: int = IGNORED_CODE) -> np.ndarray:
+    """Replace missing codes and codes outside the domain with `fill` and narrow to CODE_DTYPE."""
+    codes = values.fillna(fill).to_numpy(dtype='int16')
+    valid = np.isin(codes, domain) | (codes == fill)
+    invalid = int(codes.size - valid.sum())
+    if invalid:
+        allowed = domain if len(domain) <= 10 else f"{domain[0]}..{domain[-1]}"
+        logger.warning(f"{values.name}: {invalid} values outside {allowed} replaced with {fill}.")
+        codes = np.where(valid, codes, fill)
+    return codes.astype(CODE_DTYPE)
+
 
 def process_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """Apply standard processing to loaded data."""
-    df = df.fillna(9)
-    dt_temp = pd.to_datetime(df['DT_SIN_PRI'], format='%Y-%m-%d', errors='coerce')
+    for col, domain in CODE_DOMAINS.items():
+        df[col] = encode_code_column(df[col], domain, CODE_FILL_VALUES.get(col, IGNORED_CODE))
+    raw_dates = df['DT_SIN_PRI'].fillna(str(IGNORED_CODE))
+    derived = derive_date_columns(raw_dates)
+    df['DT_SIN_PRI'] = raw_dates.astype('category')
+    for col in DERIVED_COLUMNS:
+        df[col] = derived[col]
+    return df
 
-    df['ANO'] = dt_temp.dt.year
-    df['MES'] = dt_temp.dt.month
-    df['ANO-SEMANA'] = dt_temp.dt.strftime('%Y') + '-' + dt_temp.dt.isocalendar().week.astype(str).str.zfill(2)
-    df['ANO-MES'] = dt_temp.dt.strftime('%Y-%m')
-    df['DT_SIN_PRI_DATETIME'] = dt_temp.dt.date
 
-    return df
+def concat_frames(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate processed frames, keeping categorical columns categorical."""
+    for col in dataframes[0].select_dtypes('category').columns:
+        categories = pd.api.types.union_categoricals([df[col] for df in dataframes], sort_categories=True).categories
+        for df in dataframes:
+            df[col] = df[col].cat.set_categories(categories)
+    return pd.concat(dataframes, ignore_index=True)
+
+
+def source_name(source: str) -> str:
+    """File name identifying a source, shared by its local copy and its URL."""
+    return source.replace('\\', '/').split('/')[-1]
+
+
+def local_copy_path(source: str) -> str:
+    """Where the local copy of a source lives in DATA_DIR."""
+    return os.path.join(DATA_DIR, source_name(source))
+
 
+def open_remote(source: str, deadline: Optional[float] = None):
+    """Open a URL for parsing, downloading it to DATA_DIR as it is read (until `deadline`, if given)."""
+    return open_source(source, local_copy_path(source), CSV_SHA256.get(source_name(source)), deadline=deadline)
 
-def load_csv(source: str, local: bool) -> pd.DataFrame:
+
+def load_csv(source: str, local: bool, deadline: Optional[float] = None) -> pd.DataFrame:
     """Load CSV from local file or URL, applying processing."""
     origin = "local" if local else "URL"
     logger.info(f"Loading from {origin}: {source}")
     start = time.time()
 
-    df = pd.read_csv(
-        source,
-        sep=';',
-        usecols=COLUMNS,
-        encoding='latin1',
-        low_memory=False,
-        dtype={
-            'DT_SIN_PRI': 'string',
-            'EVOLUCAO': 'Int64',
-            'UTI': 'Int64',
-            'VACINA_COV': 'Int64',
-            'VACINA': 'Int64',
-            'CLASSI_FIN': 'Int64',
-            'SEM_PRI': 'Int64'
-        },
-    )
-
-    df = process_dataframe(df)
+    if local and PARSE_WORKERS > 1:
+        df = concat_frames(list(iter_csv_ranges(source, PARSE_WORKERS)))
+    elif local:
+        df = process_dataframe(pd.read_csv(source, **CSV_READ_OPTIONS))
+    else:
+        with open_remote(source, deadline) as stream:
+            df = process_dataframe(pd.read_csv(stream, **CSV_READ_OPTIONS))
+    df[SOURCE_COLUMN] = source_name(source)
 
     elapsed = time.time() - start
-    logger.info(f"{os.path.basename(source) if local else source.split('/')[-1]}: "
-                f"{len(df)} rows loaded in {elapsed:.2f}s")
+    logger.info(f"{source_name(source)}: {len(df)} rows loaded in {elapsed:.2f}s")
     return df
 
 
-def load_multiple(sources: List[str], from_local: bool) -> pd.DataFrame:
+def split_memory_budget(memory_limit_mb: int) -> Tuple[int, int]:
+    """Split the memory ceiling into the SQLite page cache and the chunk budget, in MB."""
+    cache_mb = max(MIN_LOAD_CACHE_MB, int(memory_limit_mb * LOAD_CACHE_SHARE))
+    return cache_mb, max(1, memory_limit_mb - cache_mb)
+
+
+def _chunk_rows_for_budget(chunk: pd.DataFrame, chunksize: int, memory_limit_mb: int) -> int:
+    """Number of rows per chunk that keeps a chunk's working set under the memory ceiling."""
+    if chunk.empty:
+        return chunksize
+    bytes_per_row = chunk.memory_usage(deep=True).sum() / len(chunk)
+    budget_rows = int(memory_limit_mb * 1024 * 1024 / (bytes_per_row * CHUNK_MEMORY_OVERHEAD))
+    return max(MIN_CHUNK_SIZE, min(chunksize, budget_rows))
+
+
+def split_byte_ranges(path: str, parts: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Split a CSV into about `parts` newline-aligned byte ranges.
+
+    Returns the header line and the (start, end) offsets of each range. Assumes no
+    quoted field spans lines, which holds for the INFLUD exports.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        bounds = [f.tell()]
+        for i in range(1, parts):
+            f.seek(bounds[0] + (size - bounds[0]) * i // parts)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return header, [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _parse_byte_range(path: str, header: bytes, start: int, end: int) -> pd.DataFrame:
+    """Parse and process one byte range of a CSV (runs in a worker process)."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(header + data), **CSV_READ_OPTIONS)
+    return process_dataframe(df)
+
+
+def iter_csv_ranges(path: str, workers: int = PARSE_WORKERS,
+                    memory_limit_mb: int = MEMORY_LIMIT_MB) -> Iterator[pd.DataFrame]:
+    """
+    Parse a local CSV in a process pool and yield the processed ranges in file order.
+
+    Ranges are sized so that all in-flight ranges fit the memory ceiling, and at most
+    two ranges per worker are submitted ahead of the one being consumed.
+    """
+    range_bytes = max(MIN_RANGE_BYTES, memory_limit_mb * 1024 * 1024 // (workers * CHUNK_MEMORY_OVERHEAD))
+    parts = max(workers, -(-os.path.getsize(path) // range_bytes))
+    header, ranges = split_byte_ranges(path, parts)
+    logger.info(f"Parsing {source_name(path)} in {len(ranges)} byte ranges with {workers} processes.")
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=get_worker_context()) as executor:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(executor.submit(_parse_byte_range, path, header, start, end))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_csv_chunks(source: str, chunksize: int = CHUNK_SIZE,
+                    memory_limit_mb: int = MEMORY_LIMIT_MB,
+                    workers: int = PARSE_WORKERS, deadline: Optional[float] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield processed chunks of a CSV without ever holding the whole file in memory.
+
+    The first chunk is read with `chunksize` rows; its measured footprint is then used
+    to shrink later chunks when needed so each one stays under `memory_limit_mb`.
+    Local files are parsed by byte ranges in `workers` processes when workers > 1;
+    URLs are parsed while they download to DATA_DIR, until `deadline` if given.
+    """
+    local = os.path.isfile(source)
+    if workers > 1 and local:
+        yield from iter_csv_ranges(source, workers, memory_limit_mb)
+        return
+
+    with (open(source, 'rb') if local else open_remote(source, deadline)) as stream, \
+            pd.read_csv(stream, chunksize=chunksize, **CSV_READ_OPTIONS) as reader:
+        rows = chunksize
+        while True:
+            try:
+                chunk = reader.get_chunk(rows)
+            except StopIteration:
+                break
+            chunk = process_dataframe(chunk)
+            new_rows = _chunk_rows_for_budget(chunk, chunksize, memory_limit_mb)
+            if new_rows != rows:
+                logger.info(f"Adjusting chunk size to {new_rows} rows to stay under {memory_limit_mb} MB.")
+                rows = new_rows
+            yield chunk
+
+
+def stream_csv_to_sqlite(source: str, local: bool, db_path: str, table: str, fingerprint: Optional[Dict] = None,
+                         chunksize: int = CHUNK_SIZE, memory_limit_mb: int = MEMORY_LIMIT_MB,
+                         deadline: Optional[float] = None) -> int:
+    """
+    Parse a CSV chunk by chunk, appending each processed chunk to the SQLite table straight away.
+
+    The source's previous rows are replaced in a single transaction (see
+    replacing_source), so they stay in place until every chunk is written and a
+    failure leaves neither partial rows nor partial columnar files behind. With a
+    fingerprint, the manifest entry is recorded in the same transaction.
+
+    `memory_limit_mb` covers both the chunks and the connection's page cache, which
+    holds the transaction's uncommitted pages (see split_memory_budget). A
+    download that runs past `deadline` fails the load, which rolls back.
+    """
+    name = source_name(source)
+    logger.info(f"Streaming from {'local' if local else 'URL'}: {source}")
+    start = time.time()
+
+    total_rows = 0
+    partial_rollups = []
+    cache_mb, chunk_memory_mb = split_memory_budget(memory_limit_mb)
+    columnar_cache.remove_source(name, columnar_cache.STAGING_DIR)
+    try:
+        with bulk_connection(db_path, cache_mb) as conn, replacing_source(conn, table, name):
+            for part, chunk in enumerate(iter_csv_chunks(source, chunksize, chunk_memory_mb, deadline=deadline)):
+                chunk[SOURCE_COLUMN] = name
+                total_rows += bulk_insert(conn, chunk, table)
+                partial_rollups.append(aggregate_rollups(chunk))
+                if COLUMNAR_CACHE:
+                    columnar_cache.write_partitions(chunk, name, part=part, cache_dir=columnar_cache.STAGING_DIR)
+                logger.info(f"{name}: {total_rows} rows streamed so far")
+            write_rollups(conn, name, combine_rollups(partial_rollups))
+            if fingerprint is not None:
+                write_manifest(conn, name, loaded_fingerprint(source, fingerprint), total_rows)
+    except BaseException:
+        columnar_cache.remove_source(name, columnar_cache.STAGING_DIR)
+        raise
+    columnar_cache.promote_source(name)
+
+    elapsed = time.time() - start
+    logger.info(f"{name}: {total_rows} rows streamed in {elapsed:.2f}s "
+                f"({total_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total_rows
+
+
+def load_multiple(sources: List[str], from_local: bool, deadline: Optional[float] = None) -> pd.DataFrame:
     """Load multiple CSVs in parallel and concatenate them."""
     start = time.time()
     logger.info("Loading datasets in parallel...")
 
     dataframes = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(4, len(sources))) as executor:
-        futures = [executor.submit(load_csv, s, from_local) for s in sources]
+    # Files already parsed by a process pool are loaded one at a time.
+    max_workers = 1 if from_local and PARSE_WORKERS > 1 else min(4, len(sources))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(load_csv, s, os.path.isfile(s), deadline) for s in sources]
         for future in concurrent.futures.as_completed(futures):
             try:
                 dataframes.append(future.result())
@@ -94,41 +434,489 @@ def load_multiple(sources: List[str], from_local: bool) -> pd.DataFrame:
     if not dataframes:
         raise RuntimeError("No datasets were loaded.")
 
-    df_final = pd.concat(dataframes, ignore_index=True)
+    df_final = concat_frames(dataframes)
     logger.info(f"Total: {len(df_final)} rows loaded in {time.time() - start:.2f}s")
     return df_final
 
 
-def save_to_sqlite(df: pd.DataFrame, db_path: str, table: str):
-    """Save DataFrame to SQLite database."""
-    logger.info(f"Saving data to {db_path}...")
+@contextmanager
+def bulk_connection(db_path: str,
+                    cache_mb: int = split_memory_budget(MEMORY_LIMIT_MB)[0]) -> Iterator[sqlite3.Connection]:
+    """
+    SQLite connection tuned for bulk loading.
+
+    Applies LOAD_PRAGMAS and a page cache of `cache_mb`. These are per-connection
+    settings, so they end with the connection, which is closed even if the load fails.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for name, value in {**LOAD_PRAGMAS, "cache_size": str(-cache_mb * 1024)}.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _sql_type(series: pd.Series) -> str:
+    """SQLite column type for a DataFrame column."""
+    if series.name in SQL_COLUMN_TYPES:
+        return SQL_COLUMN_TYPES[series.name]
+    if pd.api.types.is_integer_dtype(series):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(series):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _sql_values(series: pd.Series) -> list:
+    """Column values as Python objects SQLite accepts, with missing values as None."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Convert each category once, then index by code; code -1 picks the trailing None.
+        categories = pd.Series(series.cat.categories, name=series.name)
+        lookup = np.array(_sql_values(categories) + [None], dtype=object)
+        return lookup[series.cat.codes.to_numpy()].tolist()
+    if series.name in DATE_COLUMNS:
+        series = pd.to_datetime(series, errors='coerce').dt.strftime('%Y-%m-%d')
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+def create_table(conn: sqlite3.Connection, table: str, df: pd.DataFrame):
+    """Create the table with a schema derived from the DataFrame, if it does not exist."""
+    columns = ", ".join(f'"{col}" {_sql_type(df[col])}' for col in df.columns)
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+
+
+def bulk_insert(conn: sqlite3.Connection, df: pd.DataFrame, table: str) -> int:
+    """
+    Append a DataFrame to a table through a prepared executemany statement.
+
+    The whole frame is written in one explicit transaction, in batches of
+    BULK_BATCH_ROWS rows, and rolled back as a unit if anything fails. If a
+    transaction is already open on `conn`, the rows join it instead.
+    """
+    create_table(conn, table, df)
+    column_list = ", ".join(f'"{col}"' for col in df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    sql = f'INSERT INTO "{table}" ({column_list}) VALUES ({placeholders})'
+    rows = zip(*(_sql_values(df[col]) for col in df.columns))
+
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN")
+    try:
+        while True:
+            batch = list(itertools.islice(rows, BULK_BATCH_ROWS))
+            if not batch:
+                break
+            conn.executemany(sql, batch)
+        if own_transaction:
+            conn.execute("COMMIT")
+    except Exception:
+        if own_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    return len(df)
+
+
+def ensure_rollup_tables(conn: sqlite3.Connection):
+    """Create the rollup tables if they do not exist."""
+    key_types = {"DT_SIN_PRI_DATETIME": "TEXT", "ANO": "INTEGER", "MES": "INTEGER"}
+    for table, keys in ROLLUP_KEYS.items():
+        columns = [f"{SOURCE_COLUMN} TEXT"] + [f"{key} {key_types[key]}" for key in keys]
+        columns += [f"{measure} INTEGER" for measure in ROLLUP_MEASURES]
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({", ".join(columns)})')
+
+
+def aggregate_rollups(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Aggregate processed rows into partial daily and monthly rollups."""
+    measures = pd.DataFrame({
+        measure: (df[flag[0]] == flag[1]) if flag else True
+        for measure, flag in ROLLUP_MEASURES.items()
+    }, index=df.index).astype('int64')
+    rollups = {}
+    for table, keys in ROLLUP_KEYS.items():
+        # Rows without a valid date still count towards the monthly totals, as they
+        # do in srag_table, but have no day to belong to.
+        by = [df[key] for key in keys]
+        rollups[table] = measures.groupby(by, dropna=table == DAILY_TABLE, observed=True).sum().reset_index()
+    return rollups
+
+
+def combine_rollups(partials: List[Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """Sum partial rollups (e.g. one per chunk) into a single rollup per table."""
+    combined = {}
+    for table, keys in ROLLUP_KEYS.items():
+        frames = [partial[table] for partial in partials if not partial[table].empty]
+        if not frames:
+            combined[table] = pd.DataFrame(columns=keys + list(ROLLUP_MEASURES))
+            continue
+        for frame in frames:
+            for key in keys:
+                if isinstance(frame[key].dtype, pd.CategoricalDtype):
+                    frame[key] = frame[key].astype(frame[key].cat.categories.dtype)
+        combined[table] = pd.concat(frames, ignore_index=True).groupby(keys, dropna=False, as_index=False).sum()
+    return combined
+
+
+def write_rollups(conn: sqlite3.Connection, name: str, rollups: Dict[str, pd.DataFrame]):
+    """Append a source's rollup rows."""
+    ensure_rollup_tables(conn)
+    for table, rollup in rollups.items():
+        rollup = rollup.copy()
+        rollup.insert(0, SOURCE_COLUMN, name)
+        bulk_insert(conn, rollup, table)
+
+
+def rebuild_rollups(db_path: str, table: str):
+    """Build missing rollup tables from the rows already in the main table."""
+    with sqlite3.connect(db_path) as conn:
+        if not table_columns(conn, table):
+            return
+        missing = [rollup for rollup in ROLLUP_KEYS if not table_columns(conn, rollup)]
+        if not missing:
+            return
+        logger.info(f"Building rollup tables {', '.join(missing)} from {table}...")
+        ensure_rollup_tables(conn)
+        sums = ", ".join(
+            f"SUM({flag[0]} = {flag[1]})" if flag else "COUNT(*)" for flag in ROLLUP_MEASURES.values()
+        )
+        for rollup in missing:
+            keys = ", ".join(ROLLUP_KEYS[rollup])
+            where = " WHERE DT_SIN_PRI_DATETIME IS NOT NULL" if rollup == DAILY_TABLE else ""
+            conn.execute(
+                f'INSERT INTO "{rollup}" ({SOURCE_COLUMN}, {keys}, {", ".join(ROLLUP_MEASURES)}) '
+                f'SELECT {SOURCE_COLUMN}, {keys}, {sums} FROM "{table}"{where} GROUP BY {SOURCE_COLUMN}, {keys}'
+            )
+
+
+def drop_indexes(db_path: str):
+    """Drop the loader's indexes so bulk inserts do not maintain them row by row."""
+    with sqlite3.connect(db_path) as conn:
+        for name in [*INDEXES, *OBSOLETE_INDEXES]:
+            conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+def create_indexes(db_path: str) -> bool:
+    """Build whichever of the loader's indexes are missing, once the data is in, and drop obsolete ones."""
     start = time.time()
+    with sqlite3.connect(db_path) as conn:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for name in existing.intersection(OBSOLETE_INDEXES):
+            conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+            logger.info(f"Dropped unused index {name}.")
+        missing = {name: (table, columns) for name, (table, columns) in INDEXES.items()
+                   if name not in existing and table_columns(conn, table)}
+        if not missing:
+            return False
+        for name, (table, columns) in missing.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" {columns}')
+        conn.execute("ANALYZE")
+    logger.info(f"Indexes {', '.join(missing)} built in {time.time() - start:.2f}s")
+    return True
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Column names of a table, or an empty list if it does not exist."""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
 
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    df.to_sql(table, con=engine, index=False, if_exists="replace", chunksize=10000, method="multi")
 
-    logger.info(f"Database saved in {time.time() - start:.2f}s")
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Content hash of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(source: str, local: bool, previous: Optional[Dict] = None,
+                       deadline: Optional[float] = None) -> Dict:
+    """
+    Size, modification time and content hash of a source.
+
+    Local files are only re-hashed when their size or mtime differ from the previous
+    manifest entry. For URLs the Content-Length, Last-Modified and ETag headers
+    stand in for size, mtime and hash, so nothing is downloaded just to compare;
+    the HEAD request is capped to the time left before `deadline`.
+    """
+    if local:
+        stat = os.stat(source)
+        fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": None}
+        if previous and previous["size"] == fingerprint["size"] and previous["mtime"] == fingerprint["mtime"]:
+            fingerprint["sha256"] = previous["sha256"]
+        else:
+            fingerprint["sha256"] = file_sha256(source)
+        return fingerprint
+
+    try:
+        if is_exhausted(deadline):
+            raise TimeoutError("pipeline deadline reached")
+        response = requests.head(source, allow_redirects=True, timeout=cap_timeout(FINGERPRINT_TIMEOUT, deadline))
+        response.raise_for_status()
+        last_modified = response.headers.get("Last-Modified")
+        return {
+            "size": int(response.headers.get("Content-Length", 0)) or None,
+            "mtime": parsedate_to_datetime(last_modified).timestamp() if last_modified else None,
+            "sha256": response.headers.get("ETag"),
+        }
+    except Exception as e:
+        logger.warning(f"Could not fingerprint {source}: {e}")
+        if previous:
+            return dict(previous)
+        return {"size": None, "mtime": None, "sha256": None}
+
+
+def ensure_manifest(conn: sqlite3.Connection):
+    """Create the manifest table that tracks which source files are loaded."""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            source_file TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            sha256 TEXT,
+            rows INTEGER,
+            loaded_at TEXT
+        )
+    """)
+
+
+def read_manifest(db_path: str) -> Dict[str, Dict]:
+    """Manifest entries by source file name."""
+    with sqlite3.connect(db_path) as conn:
+        ensure_manifest(conn)
+        cursor = conn.execute(f"SELECT source_file, size, mtime, sha256, rows FROM {MANIFEST_TABLE}")
+        return {
+            name: {"size": size, "mtime": mtime, "sha256": sha256, "rows": rows}
+            for name, size, mtime, sha256, rows in cursor
+        }
+
+
+def write_manifest(conn: sqlite3.Connection, name: str, fingerprint: Dict, rows: int):
+    """Store the fingerprint of a source whose rows are fully loaded, on an open connection."""
+    ensure_manifest(conn)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {MANIFEST_TABLE} "
+        "(source_file, size, mtime, sha256, rows, loaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (name, fingerprint["size"], fingerprint["mtime"], fingerprint["sha256"], rows,
+         datetime.now(timezone.utc).isoformat()),
+    )
+
+
+def record_manifest(db_path: str, name: str, fingerprint: Dict, rows: int):
+    """Store the fingerprint of a source whose rows are now fully loaded."""
+    with sqlite3.connect(db_path) as conn:
+        write_manifest(conn, name, fingerprint, rows)
+
+
+def delete_source_rows(conn: sqlite3.Connection, table: str, name: str) -> int:
+    """Delete a source's rows, rollup rows and manifest entry on an open connection. Returns the rows deleted."""
+    ensure_manifest(conn)
+    deleted = 0
+    if SOURCE_COLUMN in table_columns(conn, table):
+        deleted = conn.execute(f'DELETE FROM "{table}" WHERE {SOURCE_COLUMN} = ?', (name,)).rowcount
+    for rollup in ROLLUP_KEYS:
+        if table_columns(conn, rollup):
+            conn.execute(f'DELETE FROM "{rollup}" WHERE {SOURCE_COLUMN} = ?', (name,))
+    conn.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE source_file = ?", (name,))
+    return deleted
+
+
+@contextmanager
+def replacing_source(conn: sqlite3.Connection, table: str, name: str) -> Iterator[sqlite3.Connection]:
+    """
+    Transaction in which a source's new rows replace its old ones.
+
+    The old rows are deleted in the same transaction that inserts the new ones, so
+    they stay visible until the replacement commits, and any failure rolls back to
+    them. `conn` must be in autocommit mode, like the ones from bulk_connection.
+    """
+    conn.execute("BEGIN")
+    try:
+        delete_source_rows(conn, table, name)
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def remove_source(db_path: str, table: str, name: str):
+    """Delete a source's rows, its columnar cache files and its manifest entry."""
+    columnar_cache.remove_source(name)
+    with sqlite3.connect(db_path) as conn:
+        deleted = delete_source_rows(conn, table, name)
+    logger.info(f"Removed {deleted} rows previously loaded from {name}.")
+
+
+def has_rows(db_path: str, table: str) -> bool:
+    """Whether the table exists and holds at least one row."""
+    with sqlite3.connect(db_path) as conn:
+        return bool(table_columns(conn, table)) and conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone() is not None
+
+
+def reset_if_untracked(db_path: str, table: str):
+    """
+    Drop data loaded before source tracking existed.
+
+    Rows without a source column cannot be replaced file by file, so such a table
+    (and any manifest describing it) is rebuilt from scratch.
+    """
+    with sqlite3.connect(db_path) as conn:
+        columns = table_columns(conn, table)
+        if columns and SOURCE_COLUMN in columns:
+            return
+        if columns:
+            logger.info(f"{table} has no {SOURCE_COLUMN} column. Rebuilding it from all sources.")
+        conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        conn.execute(f"DROP TABLE IF EXISTS {MANIFEST_TABLE}")
+        for rollup in ROLLUP_KEYS:
+            conn.execute(f'DROP TABLE IF EXISTS "{rollup}"')
+    columnar_cache.clear()
 
 
 def get_data_sources() -> (List[str], bool):
     """
-    Returns a list of sources and whether they are local or URLs.
-    Prioritizes local files if all exist.
+    Returns a list of sources and whether they are all local.
+    Prioritizes the local copy of each file, falling back to its URL.
     """
-    local_paths = [os.path.join(DATA_DIR, f) for f in LOCAL_FILES]
-    if all(os.path.isfile(p) for p in local_paths):
+    sources = []
+    for local_file, url in zip(LOCAL_FILES, CSV_URLS):
+        local_path = os.path.join(DATA_DIR, local_file)
+        sources.append(local_path if os.path.isfile(local_path) else url)
+    from_local = all(os.path.isfile(s) for s in sources)
+    if from_local:
         logger.info("Found all expected local CSV files. Using local sources.")
-        return local_paths, True
     else:
-        logger.info("Local CSV files not found. Using remote URLs.")
-        return CSV_URLS, False
+        logger.info("Some local CSV files not found. Using remote URLs for those.")
+    return sources, from_local
+
+
+def plan_ingestion(sources: List[str], manifest: Dict[str, Dict], db_path: str,
+                   deadline: Optional[float] = None):
+    """
+    Compare sources against the manifest.
+
+    Returns the (source, fingerprint) pairs that are new or changed, and the names of
+    manifest entries whose file is no longer among the sources.
+    """
+    pending = []
+    for source in sources:
+        name = source_name(source)
+        previous = manifest.get(name)
+        fingerprint = source_fingerprint(source, os.path.isfile(source), previous, deadline)
+        if previous and COLUMNAR_CACHE and not columnar_cache.has_source(name):
+            logger.info(f"{name} has no columnar cache yet. Scheduling ingestion.")
+            pending.append((source, fingerprint))
+            continue
+        if previous and all(previous[k] == fingerprint[k] for k in ("size", "mtime", "sha256")):
+            logger.info(f"{name} is unchanged since its last load. Skipping.")
+            continue
+        if previous and previous["sha256"] and previous["sha256"] == fingerprint["sha256"]:
+            logger.info(f"{name} was touched but its content is unchanged. Skipping.")
+            record_manifest(db_path, name, fingerprint, previous["rows"])
+            continue
+        logger.info(f"{name} is {'changed' if previous else 'new'}. Scheduling ingestion.")
+        pending.append((source, fingerprint))
+
+    current = {source_name(s) for s in sources}
+    stale = [name for name in manifest if name not in current]
+    return pending, stale
 
 
-def load_data():
+def loaded_fingerprint(source: str, fingerprint: Dict) -> Dict:
+    """
+    Fingerprint to record for a source that was just ingested.
+
+    A URL that was downloaded during the load is recorded by its local copy, which
+    is what later runs will find and compare against.
+    """
+    if not os.path.isfile(source) and os.path.isfile(local_copy_path(source)):
+        return source_fingerprint(local_copy_path(source), True)
+    return fingerprint
+
+
+def load_data(mode: str = INGEST_MODE, deadline: Optional[float] = None) -> bool:
+    """
+    Bring the SQLite database up to date with the data sources.
+
+    Only sources that are new or whose content changed since the last load are
+    ingested, replacing just their rows and rollup rows; rows from sources that are
+    no longer listed are removed. Returns True if the database was modified.
+
+    With a `deadline` (a time.time() value), fingerprint requests and downloads
+    are capped to the time left, and no new source is started once it is used up.
+    A source cut short keeps its previous rows and is picked up by the next run.
+    """
     logger.info("Starting data loading process...")
     sources, from_local = get_data_sources()
-    logger.info(f"Data sources determined: {sources} (local={from_local})")
-    df = load_multiple(sources, from_local)
-    logger.info("Saving loaded data to SQLite database...")
-    save_to_sqlite(df, SQLITE_DB, TABLE_NAME)
-    logger.info("Data loading and saving process completed successfully.")
\ No newline at end of file
+    logger.info(f"Data sources determined: {sources} (local={from_local}, mode={mode})")
+
+    reset_if_untracked(SQLITE_DB, TABLE_NAME)
+    rebuild_rollups(SQLITE_DB, TABLE_NAME)
+    manifest = read_manifest(SQLITE_DB)
+    pending, stale = plan_ingestion(sources, manifest, SQLITE_DB, deadline)
+
+    for name in stale:
+        logger.info(f"{name} is no longer a data source. Removing its rows.")
+        remove_source(SQLITE_DB, TABLE_NAME, name)
+
+    if not pending:
+        logger.info("Database is up to date with all data sources.")
+        indexes_built = create_indexes(SQLITE_DB)
+        return bool(stale) or indexes_built
+
+    # Each source's old rows are only replaced once its new rows are fully loaded;
+    # a source that fails to load keeps its previous rows and manifest entry.
+    # Indexes are only dropped for a load into an empty table: an incremental load
+    # needs the source index to delete the old rows, and rebuilding the indexes
+    # over the whole history would cost more than maintaining them for one file.
+    if not has_rows(SQLITE_DB, TABLE_NAME):
+        drop_indexes(SQLITE_DB)
+
+    loaded = 0
+    if mode == "stream":
+        for position, (source, fingerprint) in enumerate(pending):
+            if is_exhausted(deadline):
+                logger.warning(f"No time left before the pipeline deadline; "
+                               f"skipping {len(pending) - position} changed sources until the next run.")
+                break
+            try:
+                stream_csv_to_sqlite(source, os.path.isfile(source), SQLITE_DB, TABLE_NAME, fingerprint,
+                                     deadline=deadline)
+            except Exception as e:
+                logger.error(f"Error loading dataset {source_name(source)}: {e}")
+                continue
+            loaded += 1
+    else:
+        df = pd.DataFrame(columns=[SOURCE_COLUMN])
+        if is_exhausted(deadline):
+            logger.warning(f"No time left before the pipeline deadline; "
+                           f"skipping {len(pending)} changed sources until the next run.")
+        else:
+            try:
+                df = load_multiple([source for source, _ in pending], from_local, deadline)
+            except RuntimeError as e:
+                logger.error(str(e))
+        logger.info("Saving loaded data to SQLite database...")
+        fingerprints = {source_name(source): (source, fingerprint) for source, fingerprint in pending}
+        for name, group in df.groupby(SOURCE_COLUMN, sort=False):
+            source, fingerprint = fingerprints[name]
+            try:
+                with bulk_connection(SQLITE_DB) as conn, replacing_source(conn, TABLE_NAME, name):
+                    bulk_insert(conn, group, TABLE_NAME)
+                    write_rollups(conn, name, aggregate_rollups(group))
+                    write_manifest(conn, name, loaded_fingerprint(source, fingerprint), len(group))
+            except Exception as e:
+                logger.error(f"Error saving dataset {name}: {e}")
+                continue
+            columnar_cache.remove_source(name)
+            if COLUMNAR_CACHE:
+                columnar_cache.write_partitions(group, name)
+            loaded += 1
+
+    create_indexes(SQLITE_DB)
+    if not has_rows(SQLITE_DB, TABLE_NAME):
+        raise RuntimeError("No datasets were loaded.")
+    logger.info(f"Data loading completed: {loaded} of {len(pending)} changed sources ingested.")
+    return bool(loaded or stale)
@@ -1,7 +1,7 @@
 import logging
-import asyncio
 import os
 from pathlib import Path
+from typing import Any, Dict, List, Optional, TypedDict
 
 from langgraph.graph import StateGraph, END
 
@@ -10,22 +10,57 @@ from src.agents.visualization import VisualizationAgent
 from src.agents.news_search import NewsSearchAgent
 from src.agents.report_summary import run_report_summary_agent
 from src.utils.report_render import render_html_report, save_html_report, get_latest_report_json, load_report_data
-from src.utils.pdf_render import generate_pdf
+from src.utils.pdf_render import get_renderer
 from src.data_loader import load_data, SQLITE_DB
+from src.utils.query_plan import log_query_plans
+from src.utils.deadline import make_deadline, remaining, is_exhausted
 
 logger = logging.getLogger("health_graph")
 
+# Nodes between prepare_database and report_summary. Those listed in
+# SRAG_PARALLEL_NODES each run on their own branch, concurrently; the others run
+# one after another on a shared branch. SRAG_MAX_CONCURRENCY caps how many
+# nodes run at the same time (unbounded by default).
+BRANCH_NODES = ["metrics", "visualization", "news"]
+PARALLEL_NODES = [
+    name.strip() for name in os.getenv("SRAG_PARALLEL_NODES", ",".join(BRANCH_NODES)).split(",")
+    if name.strip()
+]
+MAX_CONCURRENCY = int(os.getenv("SRAG_MAX_CONCURRENCY", "0")) or None
+# Wall-clock limit for a whole run, in seconds (0 means no limit). Network and
+# browser calls are capped to the time left, and steps that run out of time fall
+# back to their plain content.
+PIPELINE_DEADLINE_SECONDS = float(os.getenv("PIPELINE_DEADLINE_SECONDS", "0"))
+
+
+class ReportState(TypedDict, total=False):
+    """Pipeline state. Each node returns only the keys it produces."""
+    deadline: Optional[float]
+    metrics: Dict[str, Any]
+    charts: Dict[str, Any]
+    news_analysis: Dict[str, Any]
+    report: Dict[str, Any]
+
+
+def _log_budget(state):
+    """Log the time left before the pipeline deadline, if there is one."""
+    left = remaining(state.get("deadline"))
+    if left is not None:
+        logger.info(f"{left:.1f}s left before the pipeline deadline.")
+
 
 def node_prepare_database(state):
-    """Ensures the SQLite database exists and is populated."""
+    """Ensures the SQLite database exists and is in sync with the data sources."""
     logger.info("=== STEP 1: DATABASE SETUP ===")
+    _log_budget(state)
     if not os.path.exists(SQLITE_DB):
         logger.info(f"Database not found at {SQLITE_DB}. Creating database...")
-        load_data()
-        logger.info("Database created.")
+    if load_data(deadline=state.get("deadline")):
+        logger.info(f"Database updated at {SQLITE_DB}.")
+        log_query_plans(SQLITE_DB)
     else:
-        logger.info(f"Database already exists at {SQLITE_DB}.")
-    return state
+        logger.info(f"Database at {SQLITE_DB} is already up to date.")
+    return {}
 
 def node_metrics(state):
     """Calculates epidemiological metrics."""
@@ -33,12 +68,11 @@ def node_metrics(state):
     try:
         agent = MetricsAgent()
         metrics = agent.run()
-        state["metrics"] = metrics
         logger.info("Metrics calculated successfully.")
     except Exception as e:
         logger.error(f"Error calculating metrics: {e}")
-        state["metrics"] = {}
-    return state
+        metrics = {}
+    return {"metrics": metrics}
 
 def node_visualization(state):
     """Generates charts and visualizations."""
@@ -46,89 +80,123 @@ def node_visualization(state):
     try:
         agent = VisualizationAgent()
         charts = agent.run()
-        state["charts"] = charts
         logger.info("Charts generated successfully.")
     except Exception as e:
         logger.error(f"Error generating charts: {e}")
-        state["charts"] = {}
-    return state
+        charts = {}
+    return {"charts": charts}
 
 def node_news(state):
     """Fetches and analyzes news data."""
     logger.info("=== STEP 4: NEWS FETCHING & ANALYSIS ===")
+    _log_budget(state)
     try:
         agent = NewsSearchAgent()
-        news = agent.run()
-        state["news_analysis"] = news
+        news = agent.run(deadline=state.get("deadline"))
         logger.info("News fetched successfully.")
     except Exception as e:
         logger.error(f"Error fetching news: {e}")
-        state["news_analysis"] = {}
-    return state
+        news = {}
+    return {"news_analysis": news}
 
 def node_report_summary(state):
     """Generates and saves the report summary."""
     logger.info("=== STEP 5: REPORT SUMMARY GENERATION ===")
+    _log_budget(state)
     try:
         report = run_report_summary_agent(
             metrics=state.get("metrics", {}),
             news_analysis=state.get("news_analysis", {}),
             charts=state.get("charts", {}),
-            save_json=True
+            save_json=True,
+            deadline=state.get("deadline")
         )
-        state["report"] = report
         logger.info("Report summary generated and saved successfully.")
     except Exception as e:
         logger.error(f"Error generating report summary: {e}")
-        state["report"] = {}
-    return state
+        report = {}
+    return {"report": report}
 
 def node_render_html(state):
     """Renders and saves the HTML report."""
     logger.info("=== STEP 6: HTML REPORT RENDERING ===")
     try:
-        json_path = state["report"].get("report_path") or get_latest_report_json()
+        json_path = state.get("report", {}).get("report_path") or get_latest_report_json()
         data = load_report_data(json_path)
         html = render_html_report(data)
         save_html_report(html)
         logger.info("HTML report rendered and saved successfully.")
     except Exception as e:
         logger.error(f"Error rendering HTML: {e}")
-    return state
+    return {}
 
 def node_generate_pdf(state):
     """Generates the PDF report from the HTML file."""
     logger.info("=== STEP 7: PDF GENERATION ===")
+    _log_budget(state)
+    deadline = state.get("deadline")
     try:
         html_path = Path(__file__).parent.parent / 'resources' / 'reports' / 'srag_report.html'
         pdf_path = Path(__file__).parent.parent / 'resources' / 'reports' / 'srag_report.pdf'
-        if html_path.exists():
-            asyncio.run(generate_pdf(str(html_path), str(pdf_path)))
-            logger.info("PDF generated successfully at /resources/srag_report.pdf.")
-        else:
+        if not html_path.exists():
             logger.error(f"HTML file not found: {html_path}")
+        elif is_exhausted(deadline):
+            logger.error(f"No time left before the pipeline deadline; skipping PDF. The HTML report is at {html_path}.")
+        else:
+            # The shared renderer keeps Chromium warm, so only the first report pays its startup.
+            get_renderer().render(html_path, pdf_path, timeout=remaining(deadline))
+            logger.info("PDF generated successfully at /resources/srag_report.pdf.")
+    except TimeoutError:
+        logger.error(f"PDF generation did not finish before the pipeline deadline. The HTML report is at {html_path}.")
     except Exception as e:
         logger.error(f"Error generating PDF: {e}")
-    return state
-
-
-
-def create_graph():
-    """Creates and returns the LangGraph pipeline for the health reporting agent."""
-    graph = StateGraph(None)
+    return {}
+
+
+def _in_sequence(nodes):
+    """A node that runs several nodes one after another and merges their updates."""
+    def run(state):
+        updates = {}
+        for node in nodes:
+            updates.update(node({**state, **updates}))
+        return updates
+    return run
+
+
+def create_graph(parallel_nodes: Optional[List[str]] = None):
+    """
+    Creates and returns the LangGraph pipeline for the health reporting agent.
+
+    Metrics, visualization and news do not depend on each other: the ones in
+    `parallel_nodes` (default SRAG_PARALLEL_NODES) fan out from prepare_database
+    and report_summary waits for all of them. The rest run in sequence as one
+    more branch, wrapped in a single node so that the graph's steps never wait
+    on a longer branch halfway through.
+    """
+    if parallel_nodes is None:
+        parallel_nodes = PARALLEL_NODES
+    unknown = set(parallel_nodes) - set(BRANCH_NODES)
+    if unknown:
+        raise ValueError(f"Unknown parallel nodes {sorted(unknown)}. Choose from: {', '.join(BRANCH_NODES)}.")
+
+    branch_functions = {"metrics": node_metrics, "visualization": node_visualization, "news": node_news}
+    branches = {name: branch_functions[name] for name in BRANCH_NODES if name in parallel_nodes}
+    sequential = [name for name in BRANCH_NODES if name not in parallel_nodes]
+    if sequential:
+        branches["+".join(sequential)] = _in_sequence([branch_functions[name] for name in sequential])
+
+    graph = StateGraph(ReportState)
     # Add nodes
     graph.add_node("prepare_database", node_prepare_database)
-    graph.add_node("metrics", node_metrics)
-    graph.add_node("visualization", node_visualization)
-    graph.add_node("news", node_news)
+    for name, node in branches.items():
+        graph.add_node(name, node)
     graph.add_node("report_summary", node_report_summary)
     graph.add_node("render_html", node_render_html)
     graph.add_node("generate_pdf", node_generate_pdf)
     # Add edges
-    graph.add_edge("prepare_database", "metrics")
-    graph.add_edge("metrics", "visualization")
-    graph.add_edge("visualization", "news")
-    graph.add_edge("news", "report_summary")
+    for name in branches:
+        graph.add_edge("prepare_database", name)
+    graph.add_edge(list(branches), "report_summary")
     graph.add_edge("report_summary", "render_html")
     graph.add_edge("render_html", "generate_pdf")
     graph.add_edge("generate_pdf", END)
@@ -139,8 +207,9 @@ def create_graph():
 
 def run_graph():
     """Runs the full srag reporting pipeline graph."""
-    state = {}
+    state = {"deadline": make_deadline(PIPELINE_DEADLINE_SECONDS)}
     graph = create_graph()
     compiled_graph = graph.compile()
-    result = compiled_graph.invoke(state)
+    config = {"max_concurrency": MAX_CONCURRENCY} if MAX_CONCURRENCY else None
+    result = compiled_graph.invoke(state, config=config)
     return result
\ No newline at end of file
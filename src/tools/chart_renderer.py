@@ -0,0 +1,158 @@
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from src.utils.disk_cache import make_key
+from src.utils.worker_context import get_worker_context
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for rasterizing charts; defaults to one per CPU. Starting the
+# pool costs about one matplotlib import, so batches smaller than
+# CHART_POOL_MIN_CHARTS (or a single worker) are drawn in the calling process.
+CHART_WORKERS = int(os.getenv("SRAG_CHART_WORKERS", "0")) or os.cpu_count() or 1
+CHART_POOL_MIN_CHARTS = int(os.getenv("SRAG_CHART_POOL_MIN_CHARTS", "4"))
+# A rendered chart keeps the hash of its spec next to it, in <image>.<suffix>.
+SPEC_HASH_SUFFIX = "spec-sha256"
+
+
+def _pyplot():
+    """Import pyplot and Seaborn on first use, so cached charts never load matplotlib."""
+    import matplotlib
+    # Charts are only saved to files, and may be drawn outside the main thread.
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+def _apply_style(style: Dict[str, Any]):
+    """Set the Seaborn style and palette of a chart spec on pyplot's global state."""
+    _, sns = _pyplot()
+    sns.set_style(style["sns_style"], style["sns_style_params"])
+    sns.set_palette(sns.color_palette(style["colors"]))
+
+
+def _draw_daily_cases(spec: Dict[str, Any]):
+    plt, _ = _pyplot()
+    data = spec["data"]
+    colors = spec["style"]["colors"]
+    dates = pd.to_datetime(pd.Series(data["date"]))
+
+    fig, ax = plt.subplots(figsize=spec["figsize"])
+    ax.bar(dates, pd.Series(data["cases"]), color=colors[0], alpha=0.9, label='Casos Diários')
+    if data.get("moving_average") is not None:
+        ax.plot(dates, pd.Series(data["moving_average"]), color='gray', linewidth=2, label='Média Móvel (7 dias)')
+
+    ax.set_xlabel("Data")
+    ax.set_ylabel("Número de Casos")
+    plt.xticks(rotation=45, ha='right')
+    ax.legend()
+    return fig
+
+
+def _draw_monthly_cases(spec: Dict[str, Any]):
+    plt, sns = _pyplot()
+    df = pd.DataFrame(spec["data"])
+    colors = spec["style"]["colors"]
+
+    fig, ax = plt.subplots(figsize=spec["figsize"])
+    sns.barplot(x='month_year', y='cases', data=df, ax=ax, alpha=0.9, color=colors[0])
+    ax.set_xlabel("Ano-Mês")
+    ax.set_ylabel("Número de Casos")
+    plt.xticks(rotation=45, ha='right')
+    return fig
+
+
+DRAWERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "daily_cases": _draw_daily_cases,
+    "monthly_cases": _draw_monthly_cases,
+}
+
+
+def render_chart(spec: Dict[str, Any]) -> str:
+    """
+    Draw a chart spec and save it to `spec["output_path"]`.
+
+    A spec is a plain, picklable dict: `kind` (a key of DRAWERS), `figsize`, `style`
+    (sns_style, sns_style_params and colors), `data` and `output_path`.
+    """
+    plt, _ = _pyplot()
+    _apply_style(spec["style"])
+    fig = DRAWERS[spec["kind"]](spec)
+    plt.tight_layout()
+    fig.savefig(spec["output_path"])
+    plt.close(fig)
+    logger.info(f"Chart saved at: {spec['output_path']}")
+    return spec["output_path"]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """The shared worker pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Workers fork from a server that has already imported matplotlib, so they
+            # start quickly without forking this (possibly multithreaded) process.
+            _pool = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=get_worker_context())
+        return _pool
+
+
+def spec_hash(spec: Dict[str, Any]) -> str:
+    """Hash of everything that determines a chart's pixels: kind, figure size, style and data."""
+    return make_key(spec["kind"], spec["figsize"], spec["style"], spec["data"])
+
+
+def _hash_path(output_path: str) -> Path:
+    return Path(f"{output_path}.{SPEC_HASH_SUFFIX}")
+
+
+def is_rendered(spec: Dict[str, Any]) -> bool:
+    """Whether the image at the spec's output path was rendered from an identical spec."""
+    hash_path = _hash_path(spec["output_path"])
+    try:
+        return Path(spec["output_path"]).is_file() and hash_path.read_text() == spec_hash(spec)
+    except OSError:
+        return False
+
+
+def _record_hash(spec: Dict[str, Any]):
+    hash_path = _hash_path(spec["output_path"])
+    tmp_path = hash_path.with_name(hash_path.name + ".tmp")
+    tmp_path.write_text(spec_hash(spec))
+    os.replace(tmp_path, hash_path)
+
+
+def render_charts(specs: List[Dict[str, Any]]) -> List[str]:
+    """
+    Render several chart specs and return their output paths.
+
+    Charts whose image was already rendered from an identical spec are skipped.
+    The rest are drawn in worker processes if there are at least
+    CHART_POOL_MIN_CHARTS of them, and in the calling process otherwise.
+    """
+    stale = []
+    for spec in specs:
+        if is_rendered(spec):
+            logger.info(f"Chart unchanged, reusing: {spec['output_path']}")
+        else:
+            # A failed render must not leave the old hash next to a new image.
+            _hash_path(spec["output_path"]).unlink(missing_ok=True)
+            stale.append(spec)
+    if CHART_WORKERS <= 1 or len(stale) < max(CHART_POOL_MIN_CHARTS, 2):
+        for spec in stale:
+            render_chart(spec)
+    else:
+        list(_get_pool().map(render_chart, stale))
+    for spec in stale:
+        _record_hash(spec)
+    return [spec["output_path"] for spec in specs]
@@ -0,0 +1,164 @@
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logs import setup_logging
+from src.data_loader import SQLITE_DB, TABLE_NAME, ROLLUP_MEASURES, IGNORED_CODE
+from src.utils import columnar_cache
+from src.utils.query_plan import register_query
+from src.utils.sqlite_reader import get_reader, database_fingerprint
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# "sql" aggregates the srag_monthly rollup in SQLite; "numpy" counts in memory.
+METRICS_BACKEND = os.getenv("SRAG_METRICS_BACKEND", "sql")
+
+TOTAL_COLUMNS = [f"total_{measure}" for measure in ROLLUP_MEASURES]
+FLAGGED_MEASURES = [measure for measure, flag in ROLLUP_MEASURES.items() if flag]
+
+# Every monthly metric is derived from this one aggregation.
+MONTHLY_TOTALS_QUERY = register_query("metrics.monthly_totals", """
+    select
+        ano as year,
+        mes as month,
+        sum(cases) as total_cases,
+        sum(deaths) as total_deaths,
+        sum(uti_cases) as total_uti_cases,
+        sum(vaccinated) as total_vaccinated
+    from srag_monthly
+    group by ano, mes
+    order by year desc, month desc;
+""")
+
+
+class SQLMetricsBackend:
+    """Monthly totals from the srag_monthly rollup."""
+
+    name = "sql"
+
+    def __init__(self, db_path: str = SQLITE_DB):
+        self.reader = get_reader(db_path)
+
+    def monthly_totals(self) -> pd.DataFrame:
+        return self.reader.execute_query(MONTHLY_TOTALS_QUERY)
+
+
+class NumpyMetricsBackend:
+    """
+    Monthly totals counted in memory with np.bincount.
+
+    The month and code columns are loaded once (from the columnar cache when it
+    belongs to this database, otherwise from srag_table) and folded into one
+    contiguous key per row: the month index shifted left, with one bit per measure
+    mask. A single bincount over the keys then yields every measure for every
+    month. The keys are reloaded only when the database fingerprint changes.
+    """
+
+    name = "numpy"
+
+    def __init__(self, db_path: str = SQLITE_DB):
+        self.db_path = str(Path(db_path).resolve())
+        self._keys: Optional[np.ndarray] = None
+        self._months: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _read_columns(self) -> pd.DataFrame:
+        columns = ["ANO", "MES"] + [ROLLUP_MEASURES[measure][0] for measure in FLAGGED_MEASURES]
+        if self.db_path == str(Path(SQLITE_DB).resolve()) and columnar_cache.has_data():
+            return columnar_cache.read_columns(columns)
+        query = f'SELECT {", ".join(columns)} FROM "{TABLE_NAME}"'
+        return pd.read_sql_query(query, get_reader(self.db_path).connection())
+
+    def _load(self):
+        """Build the per-row keys and the year/month of every bin from the stored rows."""
+        start = time.perf_counter()
+        df = self._read_columns()
+        year = df["ANO"].to_numpy(dtype="float64", na_value=np.nan)
+        month = df["MES"].to_numpy(dtype="float64", na_value=np.nan)
+
+        # Rows without a date share one bin after the last month, like the NULL group in SQL.
+        dated = ~(np.isnan(year) | np.isnan(month))
+        month_number = np.where(dated, year * 12 + month - 1, 0).astype("int64")
+        first = int(month_number[dated].min()) if dated.any() else 0
+        null_bin = int(month_number[dated].max()) - first + 1 if dated.any() else 0
+        index = np.where(dated, month_number - first, null_bin).astype("intp")
+
+        keys = index << len(FLAGGED_MEASURES)
+        for bit, measure in enumerate(FLAGGED_MEASURES):
+            column, value = ROLLUP_MEASURES[measure]
+            codes = df[column].to_numpy(dtype="int16", na_value=IGNORED_CODE)
+            keys |= (codes == value).astype("intp") << bit
+
+        bins = np.arange(null_bin + 1)
+        month_keys = bins + first
+        years = np.where(bins < null_bin, month_keys // 12, np.nan)
+        months = np.where(bins < null_bin, month_keys % 12 + 1, np.nan)
+        self._keys = np.ascontiguousarray(keys)
+        self._months = (years.astype("float64"), months.astype("float64"))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Loaded {len(keys)} rows into the NumPy metrics backend in {elapsed_ms:.1f} ms.")
+
+    def monthly_totals(self) -> pd.DataFrame:
+        fingerprint = database_fingerprint(self.db_path)
+        with self._lock:
+            if self._keys is None or fingerprint != self._fingerprint:
+                try:
+                    self._load()
+                except Exception as e:
+                    logger.error(f"Error loading metric columns: {e}")
+                    self._keys = None
+                    return pd.DataFrame()
+                self._fingerprint = fingerprint
+            keys, (years, months) = self._keys, self._months
+
+        start = time.perf_counter()
+        size = len(years)
+        width = 1 << len(FLAGGED_MEASURES)
+        # counts[month, pattern]: rows of that month whose measure bits equal the pattern.
+        counts = np.bincount(keys, minlength=size * width).reshape(size, width)
+        patterns = np.arange(width)
+        totals = {}
+        for measure, flag in ROLLUP_MEASURES.items():
+            if flag:
+                bit = FLAGGED_MEASURES.index(measure)
+                selected = counts[:, (patterns >> bit) & 1 == 1]
+            else:
+                selected = counts
+            totals[f"total_{measure}"] = selected.sum(axis=1).astype("int64")
+
+        present = totals["total_cases"] > 0
+        # Most recent month first, with the undated bin (if any) last.
+        order = np.flatnonzero(present[:-1])[::-1]
+        if present[-1]:
+            order = np.append(order, size - 1)
+        columns = {"year": years[order], "month": months[order]}
+        columns.update({column: totals[column][order] for column in TOTAL_COLUMNS})
+        df = pd.DataFrame(columns)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Monthly totals computed in memory. Returned {len(df)} rows in {elapsed_ms:.1f} ms.")
+        return df
+
+
+BACKENDS = {backend.name: backend for backend in (SQLMetricsBackend, NumpyMetricsBackend)}
+
+_backends: Dict[Tuple[str, str], object] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = METRICS_BACKEND, db_path: str = SQLITE_DB):
+    """The shared metrics backend of the given kind for a database file."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown metrics backend '{name}'. Choose one of: {', '.join(BACKENDS)}.")
+    key = (name, str(Path(db_path).resolve()))
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = BACKENDS[name](db_path)
+        return _backends[key]
@@ -1,38 +1,122 @@
-import sqlite3
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dateutil.relativedelta import relativedelta
 
 from src.utils.logs import setup_logging
+from src.data_loader import SQLITE_DB
+from src.utils.sqlite_reader import get_reader
+from src.tools.metrics_backends import METRICS_BACKEND, TOTAL_COLUMNS, get_backend
 import logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+RATE_COLUMNS = ["case_increase_rate", "mortality_rate", "uti_occupancy_rate", "vaccination_rate"]
+
+
 class MetricsTool:
-    """Tool to consult the SQLite database."""
+    """
+    Tool to consult the SQLite database.
+
+    Monthly totals come from a pluggable backend ("sql" or "numpy", see
+    SRAG_METRICS_BACKEND); every metric is derived from them the same way.
+    """
 
-    def __init__(self, db_path: str = "src/database.db"):
+    def __init__(self, db_path: str = SQLITE_DB, backend: str = METRICS_BACKEND):
         self.db_path = db_path
-    
+        self.reader = get_reader(db_path)
+        self.backend = get_backend(backend, db_path)
+
     def execute_query(self, query: str) -> pd.DataFrame:
         """Executes a SQL query and returns a DataFrame."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                df = pd.read_sql_query(query, conn)
-                logger.info(f"Query executed successfully. Returned {len(df)} rows.")
-                return df
-        except Exception as e:
-            logger.error(f"Error executing query: {e}")
-            return pd.DataFrame()
+        return self.reader.execute_query(query)
+
+    def get_monthly_totals(self) -> pd.DataFrame:
+        """
+        Case, death, ICU and vaccinated totals for every month, most recent first.
+
+        Returns:
+            pd.DataFrame: columns year, month, total_cases, total_deaths,
+            total_uti_cases and total_vaccinated.
+        """
+        return self.backend.monthly_totals()
 
+    def get_metric_series(self, monthly_totals: Optional[pd.DataFrame] = None,
+                          rolling_window: Optional[int] = None) -> pd.DataFrame:
+        """
+        Every rate for every month, computed in one pass over the monthly totals.
+
+        Every calendar month from the first to the most recent month with data is
+        included, in chronological order, with zero totals for months without
+        rows; rows without a date are left out. The most recent month is flagged
+        as incomplete. With a rolling window of N months, rolling totals and rates
+        over the last N calendar months are added as `<column>_rolling_<N>`
+        (rates are ratios of the rolling totals).
 
+        Returns:
+            pd.DataFrame: year, month, is_complete, the total_* columns,
+            case_increase_rate (percent change from the previous month),
+            mortality_rate, uti_occupancy_rate and vaccination_rate (percent of
+            cases), plus the rolling columns if requested. Undefined rates are NaN.
+        """
+        if monthly_totals is None:
+            monthly_totals = self.get_monthly_totals()
+        if monthly_totals.empty:
+            return pd.DataFrame(columns=["year", "month", "is_complete"] + TOTAL_COLUMNS + RATE_COLUMNS)
+
+        series = _calendar_months(monthly_totals.dropna(subset=["year", "month"]))
+        series.insert(2, "is_complete", series.index < len(series) - 1)
+
+        series = pd.concat([series, self._rates(series)], axis=1)
+        if rolling_window:
+            rolling = series[TOTAL_COLUMNS].rolling(rolling_window, min_periods=rolling_window).sum()
+            rolling_rates = self._rates(rolling)
+            rolling = pd.concat([rolling, rolling_rates], axis=1)
+            series = pd.concat([series, rolling.add_suffix(f"_rolling_{rolling_window}")], axis=1)
+        return series
+
+    @staticmethod
+    def _rates(totals: pd.DataFrame) -> pd.DataFrame:
+        """Month-over-month case change and percent-of-cases rates for a frame of totals."""
+        cases = totals["total_cases"]
+        previous_cases = cases.shift(1)
+        cases_or_nan = cases.where(cases > 0)
+        return pd.DataFrame({
+            "case_increase_rate": ((cases - previous_cases) / previous_cases.where(previous_cases != 0)) * 100,
+            "mortality_rate": (totals["total_deaths"] / cases_or_nan) * 100,
+            "uti_occupancy_rate": totals["total_uti_cases"] / cases_or_nan * 100,
+            "vaccination_rate": totals["total_vaccinated"] / cases_or_nan * 100,
+        }, index=totals.index)
+
+    def _complete_months(self, series: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """Months of the metric series that have data, without the most recent one (which may be incomplete)."""
+        if series is None:
+            series = self.get_metric_series()
+        return series[series["is_complete"] & (series["total_cases"] > 0)]
+
+    def get_all_month_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Calculate every monthly metric from a single aggregation query.
+
+        Returns:
+            dict: case_increase_rate, mortality_rate, uti_occupancy_rate and
+            vaccination_rate, as returned by the individual methods.
+        """
+        series = self.get_metric_series()
+        return {
+            "case_increase_rate": self.get_month_case_increase_rate(series),
+            "mortality_rate": self.get_month_mortality_rate(series),
+            "uti_occupancy_rate": self.get_month_uti_occupancy_rate(series),
+            "vaccination_rate": self.get_month_covid_vaccination_rate(series)
+        }
 
-    def get_month_case_increase_rate(self) -> Dict[str, Any]:
+    def get_month_case_increase_rate(self, series: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """
         Calculate the percentage increase in case counts between the last two complete months.
 
-        Ignores the most recent month (which may be incomplete).
+        Ignores the most recent month (which may be incomplete) and months without
+        data, so the two months compared need not be adjacent. Pass the result of
+        get_metric_series to reuse it instead of computing it again.
 
         Returns:
             dict: {
@@ -43,58 +127,34 @@ class MetricsTool:
                 "percent_increase_rate": float or None
             }
         """
-        query = """
-        with cases_per_month as (
-            select
-                ano as year,
-                mes as month,
-                count(*) as total_cases
-            from srag_table
-            group by ano, mes
-        ),
-        ordered as (
-            select *
-            from cases_per_month
-            order by year desc, month desc
-        )
-        select *
-        from ordered
-        limit -1 offset 1;
-        """
-
-        df = self.execute_query(query)
+        df = self._complete_months(series)
 
         if df.empty or len(df) < 2:
             logger.warning("Insufficient data to calculate the increase rate.")
             return {}
 
-        df = df.sort_values(by=["year", "month"], ascending=False).head(2)
-
-        latest_cases = df.iloc[0]["total_cases"]
-        previous_cases = df.iloc[1]["total_cases"]
-
-        if previous_cases == 0:
+        latest, previous = df.iloc[-1], df.iloc[-2]
+        percent_increase_rate = _rate_or_none(self._rates(df.iloc[-2:])["case_increase_rate"].iloc[-1])
+        if percent_increase_rate is None:
             logger.warning("Previous month has zero cases, cannot calculate rate.")
-            percent_increase_rate = None
-        else:
-            percent_increase_rate = ((latest_cases - previous_cases) / previous_cases) * 100
 
         result = {
-            "current_month": (int(df.iloc[0]["year"]), int(df.iloc[0]["month"])),
-            "latest_cases": int(latest_cases),
-            "compared_month": (int(df.iloc[1]["year"]), int(df.iloc[1]["month"])),
-            "previous_cases": int(previous_cases),
+            "current_month": (int(latest["year"]), int(latest["month"])),
+            "latest_cases": int(latest["total_cases"]),
+            "compared_month": (int(previous["year"]), int(previous["month"])),
+            "previous_cases": int(previous["total_cases"]),
             "percent_increase_rate": percent_increase_rate
         }
 
         logger.info(f"Increase rate calculated: {percent_increase_rate:.4f}")
         return result
 
-    def get_month_mortality_rate(self) -> Dict[str, Any]:
+    def get_month_mortality_rate(self, series: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """
         Calculate the mortality rate (EVOLUCAO = 2) for the last complete month.
 
-        Ignores the most recent month (which may be incomplete).
+        Ignores the most recent month (which may be incomplete). Pass the result of
+        get_metric_series to reuse it instead of computing it again.
 
         Returns:
             dict: {
@@ -105,54 +165,32 @@ class MetricsTool:
                 "mortality_rate": float or None
             }
         """
-        query = """
-        with cases_per_month as (
-            select
-                ano as year,
-                mes as month,
-                count(*) as total_cases,
-                sum(case when evolucao = 2 then 1 else 0 end) as total_deaths
-            from srag_table
-            group by ano, mes
-        ),
-        ordered as (
-            select *
-            from cases_per_month
-            order by year desc, month desc
-        )
-        select *
-        from ordered
-        limit 1 offset 1;
-        """
-
-        df = self.execute_query(query)
+        df = self._complete_months(series)
 
         if df.empty:
             logger.warning("Insufficient data to calculate the mortality rate for the last complete month.")
             return {}
 
-        row = df.iloc[0]
-        total_cases = row["total_cases"]
-        total_deaths = row["total_deaths"]
-
-        mortality_rate = ((total_deaths / total_cases) * 100) if total_cases > 0 else None
+        row = df.iloc[-1]
+        mortality_rate = _rate_or_none(row["mortality_rate"])
 
         result = {
             "year": int(row["year"]),
             "month": int(row["month"]),
-            "total_cases": int(total_cases),
-            "total_deaths": int(total_deaths),
+            "total_cases": int(row["total_cases"]),
+            "total_deaths": int(row["total_deaths"]),
             "mortality_rate": mortality_rate
         }
 
         logger.info(f"Mortality rate for the last complete month ({result['year']}-{result['month']}): {mortality_rate}")
         return result
 
-    def get_month_uti_occupancy_rate(self) -> Dict[str, Any]:
+    def get_month_uti_occupancy_rate(self, series: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """
         Calculate the ICU (UTI) occupancy rate for the last complete month.
 
-        Ignores the most recent month (which may be incomplete).
+        Ignores the most recent month (which may be incomplete). Pass the result of
+        get_metric_series to reuse it instead of computing it again.
 
         Returns:
             dict: {
@@ -163,54 +201,32 @@ class MetricsTool:
                 "uti_occupancy_rate_percent": float or None
             }
         """
-        query = """
-        with cases_per_month as (
-            select
-                ano as year,
-                mes as month,
-                count(*) as total_cases,
-                sum(case when uti = 1 then 1 else 0 end) as total_uti_cases
-            from srag_table
-            group by ano, mes
-        ),
-        ordered as (
-            select *
-            from cases_per_month
-            order by year desc, month desc
-        )
-        select *
-        from ordered
-        limit 1 offset 1;
-        """
-
-        df = self.execute_query(query)
+        df = self._complete_months(series)
 
         if df.empty:
             logger.warning("Insufficient data to calculate the ICU occupancy rate for the last complete month.")
             return {}
 
-        row = df.iloc[0]
-        total_cases = row["total_cases"]
-        total_uti_cases = row["total_uti_cases"]
-
-        occupancy_rate = (total_uti_cases / total_cases * 100) if total_cases > 0 else None
+        row = df.iloc[-1]
+        occupancy_rate = _rate_or_none(row["uti_occupancy_rate"])
 
         result = {
             "year": int(row["year"]),
             "month": int(row["month"]),
-            "total_cases": int(total_cases),
-            "total_uti_cases": int(total_uti_cases),
+            "total_cases": int(row["total_cases"]),
+            "total_uti_cases": int(row["total_uti_cases"]),
             "uti_occupancy_rate_percent": round(occupancy_rate, 2) if occupancy_rate is not None else None
         }
 
         logger.info(f"UTI occupancy rate for the last complete month ({result['year']}-{result['month']}): {result['uti_occupancy_rate_percent']}%")
         return result
 
-    def get_month_covid_vaccination_rate(self) -> Dict[str, Any]:
+    def get_month_covid_vaccination_rate(self, series: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """
         Calculate the COVID vaccination rate (VACINA_COV = 1) for the last complete month.
 
-        Ignores the most recent month (which may be incomplete).
+        Ignores the most recent month (which may be incomplete). Pass the result of
+        get_metric_series to reuse it instead of computing it again.
 
         Returns:
             dict: {
@@ -221,45 +237,40 @@ class MetricsTool:
                 "covid_vaccination_rate_percent": float or None
             }
         """
-        query = """
-        with cases_per_month as (
-            select
-                ano as year,
-                mes as month,
-                count(*) as total_cases,
-                sum(case when vacina_cov = 1 then 1 else 0 end) as total_vaccinated
-            from srag_table
-            group by ano, mes
-        ),
-        ordered as (
-            select *
-            from cases_per_month
-            order by year desc, month desc
-        )
-        select *
-        from ordered
-        limit 1 offset 1;
-        """
-
-        df = self.execute_query(query)
+        df = self._complete_months(series)
 
         if df.empty:
             logger.warning("Insufficient data to calculate the COVID vaccination rate for the last complete month.")
             return {}
 
-        row = df.iloc[0]
-        total_cases = row["total_cases"]
-        total_vaccinated = row["total_vaccinated"]
-
-        vaccination_rate = (total_vaccinated / total_cases * 100) if total_cases > 0 else None
+        row = df.iloc[-1]
+        vaccination_rate = _rate_or_none(row["vaccination_rate"])
 
         result = {
             "year": int(row["year"]),
             "month": int(row["month"]),
-            "total_cases": int(total_cases),
-            "total_vaccinated": int(total_vaccinated),
+            "total_cases": int(row["total_cases"]),
+            "total_vaccinated": int(row["total_vaccinated"]),
             "covid_vaccination_rate_percent": round(vaccination_rate, 2) if vaccination_rate is not None else None
         }
 
         logger.info(f"COVID vaccination rate for the last complete month ({result['year']}-{result['month']}): {result['covid_vaccination_rate_percent']}%")
         return result
+
+
+def _calendar_months(monthly_totals: pd.DataFrame) -> pd.DataFrame:
+    """Monthly totals reindexed to every calendar month in their range, in order, with zeros for missing months."""
+    months = monthly_totals["year"].astype("int64") * 12 + monthly_totals["month"].astype("int64") - 1
+    totals = monthly_totals[TOTAL_COLUMNS].set_axis(months).sort_index()
+    if totals.empty:
+        return pd.DataFrame(columns=["year", "month"] + TOTAL_COLUMNS)
+    totals = totals.reindex(range(totals.index[0], totals.index[-1] + 1), fill_value=0)
+    return pd.concat([
+        pd.DataFrame({"year": totals.index // 12, "month": totals.index % 12 + 1}, index=totals.index),
+        totals,
+    ], axis=1).reset_index(drop=True)
+
+
+def _rate_or_none(value) -> Optional[float]:
+    """A rate from the series as a float, or None where it is undefined (NaN)."""
+    return None if pd.isna(value) else float(value)
@@ -1,22 +1,184 @@
 
 import os
 import json
+import math
+import time
+import threading
 import requests
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 import logging
 
+from src.utils.deadline import cap_timeout, is_exhausted
+from src.utils.disk_cache import CACHE_ROOT, DiskCache, make_key
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+SERPER_NEWS_URL = os.getenv("SERPER_NEWS_URL", "https://google.serper.dev/news")
+# Seconds allowed for each Serper request and for the whole search.
+NEWS_REQUEST_TIMEOUT = float(os.getenv("NEWS_REQUEST_TIMEOUT", "10"))
+NEWS_DEADLINE = float(os.getenv("NEWS_DEADLINE", "15"))
+NEWS_MAX_WORKERS = int(os.getenv("NEWS_MAX_WORKERS", "7"))
+# Unique articles each term is expected to add. Terms are queried in waves: first
+# enough to reach max_results with one term to spare, then all remaining terms at
+# once as soon as the results so far (and those expected in flight) fall short.
+NEWS_EXPECTED_PER_TERM = int(os.getenv("NEWS_EXPECTED_PER_TERM", "5"))
+
+# Per-term result cache. Entries younger than NEWS_CACHE_TTL seconds are used as is;
+# for NEWS_CACHE_STALE_SECONDS after that they are still used, but refreshed in the
+# background (stale-while-revalidate). NEWS_CACHE_TTL=0 disables the cache.
+NEWS_CACHE_DIR = CACHE_ROOT / "news"
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "3600"))
+NEWS_CACHE_STALE_SECONDS = float(os.getenv("NEWS_CACHE_STALE_SECONDS", "0"))
+NEWS_CACHE_MAX_MB = int(os.getenv("NEWS_CACHE_MAX_MB", "16"))
+
+SEARCH_TERMS = [
+    "Síndrome Respiratória Aguda Grave",
+    "SRAG Brasil",
+    "Surto respiratório Brasil",
+    "Influenza Brasil",
+    "COVID-19 Brasil",
+    "Gripes no Brasil",
+    "Mortes por síndrome respiratória aguda grave"
+]
+
+
 class NewsSearchTool:
     """Tool to search for news about SRAG (Severe Acute Respiratory Syndrome)."""
 
-    def search_srag_news(self, max_results: int = 5) -> List[Dict[str, str]]:
+    def __init__(self, session: Optional[requests.Session] = None, cache: Optional[DiskCache] = None):
+        if session is None:
+            # Keep-alive connections for every worker, reused across searches.
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=NEWS_MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        if cache is None and NEWS_CACHE_TTL > 0:
+            cache = DiskCache(NEWS_CACHE_DIR, NEWS_CACHE_MAX_MB * 1024 * 1024)
+        self.cache = cache
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+    def _fetch_term(self, term: str, headers: Dict[str, str], timeout: float,
+                    abandoned: Optional[threading.Event] = None) -> List[Dict[str, str]]:
+        """
+        Query Serper for one term and cache the result. Returns an empty list if the request fails.
+
+        Failures of a request the search has already given up on (`abandoned` is set)
+        are only logged at debug level.
+        """
+        payload = {"q": term, "type": "news"}
+        try:
+            response = self.session.post(
+                SERPER_NEWS_URL,
+                headers=headers,
+                data=json.dumps(payload),
+                timeout=timeout
+            )
+            if response.status_code != 200:
+                logger.warning(f"Serper API returned status {response.status_code} for term '{term}'")
+                return []
+            data = response.json()
+        except Exception as e:
+            if abandoned is not None and abandoned.is_set():
+                logger.debug(f"Abandoned news request for '{term}' failed: {e}")
+            else:
+                logger.error(f"Error fetching news for '{term}': {e}")
+            return []
+        articles = [
+            {
+                "title": item.get("title"),
+                "summary": item.get("snippet"),
+                "source": item.get("source"),
+                "date": item.get("date"),
+                "url": item.get("link")
+            }
+            for item in data.get("news", [])
+        ]
+        if self.cache is not None:
+            try:
+                self.cache.set(make_key(SERPER_NEWS_URL, term), articles)
+            except OSError as e:
+                logger.warning(f"Could not cache news for '{term}': {e}")
+        return articles
+
+    def _cached_term(self, term: str, headers: Dict[str, str],
+                     deadline: Optional[float] = None) -> Optional[List[Dict[str, str]]]:
+        """
+        Cached articles for a term, or None if they must be fetched.
+
+        Stale entries within the stale window are returned and refreshed in a
+        daemon thread, whose request is capped to the time left before `deadline`
+        (and skipped once it is exhausted), so it never holds the process open.
+        """
+        if self.cache is None:
+            return None
+        entry = self.cache.get_entry(make_key(SERPER_NEWS_URL, term))
+        if entry is None:
+            return None
+        articles, age = entry
+        if age <= NEWS_CACHE_TTL:
+            return articles
+        if age > NEWS_CACHE_TTL + NEWS_CACHE_STALE_SECONDS:
+            return None
+        if is_exhausted(deadline):
+            return articles
+        timeout = cap_timeout(NEWS_REQUEST_TIMEOUT, deadline)
+        with self._refresh_lock:
+            if term not in self._refreshing:
+                self._refreshing.add(term)
+                threading.Thread(target=self._refresh_term, args=(term, headers, timeout),
+                                 name="news-refresh", daemon=True).start()
+        return articles
+
+    def _start_fetch(self, term: str, headers: Dict[str, str], timeout: float,
+                     slots: threading.Semaphore, abandoned: threading.Event) -> Future:
+        """
+        Fetch a term in a daemon thread and return a future for its articles.
+
+        Daemon threads, like the stale-cache refreshes, let the process exit without
+        waiting for requests the search has abandoned. At most NEWS_MAX_WORKERS
+        requests (`slots`) run at once; a queued one is skipped once abandoned.
+        """
+        future = Future()
+
+        def fetch():
+            with slots:
+                if abandoned.is_set():
+                    future.set_result([])
+                    return
+                future.set_result(self._fetch_term(term, headers, timeout, abandoned))
+
+        threading.Thread(target=fetch, name="news", daemon=True).start()
+        return future
+
+    def _refresh_term(self, term: str, headers: Dict[str, str], timeout: float):
+        try:
+            self._fetch_term(term, headers, timeout)
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(term)
+
+    def search_srag_news(self, max_results: int = 5, deadline: Optional[float] = None) -> List[Dict[str, str]]:
         """
         Search for news about Severe Acute Respiratory Syndrome using the Serper API.
+
+        Terms with a fresh cached result are not queried. The rest are queried
+        concurrently in two waves: the first holds enough terms to be expected to
+        reach `max_results` plus one to spare (see NEWS_EXPECTED_PER_TERM), and as
+        soon as the merged results and the terms in flight fall short of that,
+        every remaining term is sent at once. Results are merged in term order, so
+        the output is the same as querying the terms one by one. Whatever has
+        arrived by NEWS_DEADLINE, or by `deadline` if that comes first, is returned.
+
         Args:
             max_results (int): Maximum number of unique news articles to return.
+            deadline (float, optional): Pipeline deadline as a time.time() value.
         Returns:
             List[Dict[str, str]]: List of news articles with title, summary, source, date, and url.
         """
@@ -24,51 +186,87 @@ class NewsSearchTool:
         if not serper_api_key:
             logger.error("SERPER_API_KEY not found in environment.")
             return []
-        search_terms = [
-            "Síndrome Respiratória Aguda Grave",
-            "SRAG Brasil",
-            "Surto respiratório Brasil",
-            "Influenza Brasil",
-            "COVID-19 Brasil",
-            "Gripes no Brasil",
-            "Mortes por síndrome respiratória aguda grave"
-        ]
         headers = {
             "X-API-KEY": serper_api_key,
             "Content-Type": "application/json"
         }
-        news_results = []
-        for term in search_terms:
-            payload = {"q": term, "type": "news"}
-            try:
-                response = requests.post(
-                    "https://google.serper.dev/news",
-                    headers=headers,
-                    data=json.dumps(payload),
-                    timeout=10
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    for item in data.get("news", []):
-                        news_results.append({
-                            "title": item.get("title"),
-                            "summary": item.get("snippet"),
-                            "source": item.get("source"),
-                            "date": item.get("date"),
-                            "url": item.get("link")
-                        })
-                else:
-                    logger.warning(f"Serper API returned status {response.status_code} for term '{term}'")
-            except Exception as e:
-                logger.error(f"Error fetching news for '{term}': {e}")
-        # Remove duplicates based on URL
+
+        start = time.monotonic()
+        search_deadline = start + cap_timeout(NEWS_DEADLINE, deadline)
+        results: Dict[int, List[Dict[str, str]]] = {}
         seen = set()
         unique_news = []
-        for news in news_results:
-            if news["url"] not in seen:
-                unique_news.append(news)
-                seen.add(news["url"])
-            if len(unique_news) >= max_results:
-                break
-        logger.info(f"Found {len(unique_news)} news articles about SRAG via Serper API")
-        return unique_news
\ No newline at end of file
+        merged = 0
+
+        misses = deque()
+        for index, term in enumerate(SEARCH_TERMS):
+            cached = self._cached_term(term, headers, deadline)
+            if cached is None:
+                misses.append(index)
+            else:
+                results[index] = cached
+
+        if misses and is_exhausted(deadline):
+            logger.warning(f"No time left before the pipeline deadline; skipping {len(misses)} uncached terms.")
+            misses.clear()
+
+        # Articles wanted with one term's worth to spare, and the first wave sized for it.
+        target = max_results + NEWS_EXPECTED_PER_TERM
+        wave = math.ceil(max_results / NEWS_EXPECTED_PER_TERM) + 1
+        futures = {}
+        pending = set()
+        slots = threading.Semaphore(NEWS_MAX_WORKERS)
+        abandoned = threading.Event()
+        try:
+            while True:
+                # Merge only the finished prefix of the terms, to keep the order deterministic.
+                while merged in results and len(unique_news) < max_results:
+                    for news in results.pop(merged):
+                        if news["url"] not in seen:
+                            unique_news.append(news)
+                            seen.add(news["url"])
+                        if len(unique_news) >= max_results:
+                            break
+                    merged += 1
+                if len(unique_news) >= max_results:
+                    break
+                time_left = search_deadline - time.monotonic()
+                # Send the first wave, then everything else once the articles merged
+                # and expected from the terms in flight fall short of the target.
+                if not futures:
+                    batch = wave
+                elif len(unique_news) + NEWS_EXPECTED_PER_TERM * len(pending) < target:
+                    batch = len(misses)
+                else:
+                    batch = 0
+                timeout = min(cap_timeout(NEWS_REQUEST_TIMEOUT, deadline), time_left)
+                while misses and batch > 0 and time_left > 0:
+                    index = misses.popleft()
+                    future = self._start_fetch(SEARCH_TERMS[index], headers, timeout, slots, abandoned)
+                    futures[future] = index
+                    pending.add(future)
+                    batch -= 1
+                if not pending:
+                    break
+                if time_left <= 0:
+                    logger.warning(f"News search deadline reached with {len(pending)} terms still pending.")
+                    break
+                done, pending = wait(pending, timeout=time_left, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[futures[future]] = future.result()
+        finally:
+            if pending:
+                abandoned.set()
+
+        # Terms that finished after an earlier one timed out still count, in order.
+        for index in sorted(results):
+            for news in results[index]:
+                if len(unique_news) >= max_results:
+                    break
+                if news["url"] not in seen:
+                    unique_news.append(news)
+                    seen.add(news["url"])
+
+        elapsed = time.monotonic() - start
+        logger.info(f"Found {len(unique_news)} news articles about SRAG via Serper API in {elapsed:.2f}s")
+        return unique_news
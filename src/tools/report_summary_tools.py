@@ -1,168 +1,132 @@
-import os
 import json
-import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Tuple
+
+from src.utils.llm_client import get_client
+from src.utils.prompt_builder import PROMPT_TOKEN_BUDGET, build_prompt, compact_json, format_news, truncate_to_tokens
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prompt templates. Values are filled in by build_prompt within PROMPT_TOKEN_BUDGET.
+SUMMARY_METRICS_TEMPLATE = (
+    "Gere um relatório automatizado sobre Síndrome Respiratória Aguda Grave (SRAG) para gestores brasileiros, usando os dados e notícias abaixo.\n"
+    "Estruture a resposta assim:\n"
+    "1. Resumo executivo do cenário atual (máx. 5 linhas).\n"
+    "2. Para cada métrica, apresente o valor, explique o significado e comente tendências ou anomalias:\n"
+    "   - Taxa de aumento de casos\n"
+    "   - Taxa de mortalidade\n"
+    "   - Taxa de ocupação de UTI\n"
+    "   - Taxa de vacinação\n"
+    "3. Relacione as métricas com as notícias recentes, explicando possíveis causas para tendências observadas.\n"
+    "4. Cite as fontes de dados e notícias utilizadas.\n"
+    "\nMÉTRICAS:\n"
+    "{metrics}\n"
+    "NOTÍCIAS:\n"
+    "{news}\n"
+    "Responda em português, de forma clara, objetiva e profissional, com no máximo 20 linhas."
+)
+
+SUMMARY_CHARTS_TEMPLATE = (
+    "Analise as datas e conteúdos das notícias abaixo e compare com as tendências descritas nos gráficos diários e mensais.\n"
+    "1. Diga se as tendências dos gráficos coincidem com o que está sendo relatado nas notícias (ex: aumento ou queda de casos em determinado mês/ano).\n"
+    "2. Destaque convergências ou divergências relevantes para o relatório epidemiológico.\n"
+    "3. Cite as fontes de dados e notícias utilizadas.\n"
+    "\nNOTÍCIAS:\n"
+    "{news}\n"
+    "GRÁFICO DIÁRIO:\n"
+    "{daily_desc}\n"
+    "GRÁFICO MENSAL:\n"
+    "{monthly_desc}\n"
+    "Responda em português, de forma clara, objetiva e profissional, com no máximo 20 linhas."
+)
+
+EXECUTIVE_SUMMARY_TEMPLATE = (
+    "Com base nos dois resumos abaixo (um sobre métricas e notícias, outro sobre análise de gráficos e notícias), escreva um resumo executivo final, comentando sobre o todo, destacando riscos e alertas para gestores públicos.\n"
+    "1. Destaque os principais pontos de atenção e tendências.\n"
+    "2. Comente sobre tendências dos gráficos.\n"
+    "3. Seja conciso, objetivo e profissional.\n"
+    "\nRESUMO MÉTRICAS/NOTÍCIAS:\n"
+    "{summary_metrics}\n"
+    "RESUMO GRÁFICOS/NOTÍCIAS:\n"
+    "{summary_charts}\n"
+    "Responda em português, em formato de texto corrido (sem tópicos ou listas), com no máximo 12 linhas."
+)
+
 
-def generate_summary_metrics(metrics, news_analysis):
+def generate_summary_metrics(metrics, news_analysis, deadline=None):
     """
     Generate a structured summary of the srag epidemiological metrics and news context.
-    Uses LLM if available, otherwise produces a simple summary.
+    Uses LLM if available (and the deadline allows), otherwise produces a simple summary.
     """
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    news_summary = news_analysis.get('summary', 'Nenhuma notícia analisada') if news_analysis else ''
-    prompt = (
-        "Gere um relatório automatizado sobre Síndrome Respiratória Aguda Grave (SRAG) para gestores brasileiros, usando os dados e notícias abaixo.\n"
-        "Estruture a resposta assim:\n"
-        "1. Resumo executivo do cenário atual (máx. 5 linhas).\n"
-        "2. Para cada métrica, apresente o valor, explique o significado e comente tendências ou anomalias:\n"
-        "   - Taxa de aumento de casos\n"
-        "   - Taxa de mortalidade\n"
-        "   - Taxa de ocupação de UTI\n"
-        "   - Taxa de vacinação\n"
-        "3. Relacione as métricas com as notícias recentes, explicando possíveis causas para tendências observadas.\n"
-        "4. Cite as fontes de dados e notícias utilizadas.\n"
-        "\nMÉTRICAS:\n"
-        f"{json.dumps(metrics, ensure_ascii=False, indent=2)}\n"
-        "NOTÍCIAS:\n"
-        f"{news_summary}\n"
-        "Responda em português, de forma clara, objetiva e profissional, com no máximo 20 linhas."
+    prompt = build_prompt(
+        SUMMARY_METRICS_TEMPLATE,
+        fixed={"metrics": compact_json(metrics)},
+        flexible={"news": lambda max_tokens: format_news(news_analysis, max_tokens)}
     )
-    if openai_api_key:
-        try:
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": "Você é um especialista em saúde pública, com foco em doenças respiratórias agudas graves (SRAG)."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 500,
-                    "temperature": 0.7
-                },
-                timeout=30
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                logger.error(f"OpenAI response error: {response.status_code} - {response.text}")
-        except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}")
+    content = get_client().chat(prompt, deadline=deadline)
+    if content is not None:
+        return content
     # fallback
+    news_summary = format_news(news_analysis, PROMPT_TOKEN_BUDGET)
     return (
         "Resumo das métricas:\n"
         f"Métricas: {metrics}\n"
         f"Notícias: {news_summary}"
     )
 
-def generate_summary_charts(news_analysis, charts):
+def generate_summary_charts(news_analysis, charts, deadline=None):
     """
     Generate a summary relating the dates/content of the news with trends in the charts (daily and monthly).
-    Uses LLM if available, otherwise produces a simple summary.
+    Uses LLM if available (and the deadline allows), otherwise produces a simple summary.
     """
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    news_summary = news_analysis.get('summary', 'Nenhuma notícia analisada') if news_analysis else ''
     daily_desc = charts.get('daily_cases_chart', {}).get('description', '') if charts else ''
     monthly_desc = charts.get('monthly_cases_chart', {}).get('description', '') if charts else ''
-    prompt = (
-        "Analise as datas e conteúdos das notícias abaixo e compare com as tendências descritas nos gráficos diários e mensais.\n"
-        "1. Diga se as tendências dos gráficos coincidem com o que está sendo relatado nas notícias (ex: aumento ou queda de casos em determinado mês/ano).\n"
-        "2. Destaque convergências ou divergências relevantes para o relatório epidemiológico.\n"
-        "3. Cite as fontes de dados e notícias utilizadas.\n"
-        "\nNOTÍCIAS:\n"
-        f"{news_summary}\n"
-        "GRÁFICO DIÁRIO:\n"
-        f"{daily_desc}\n"
-        "GRÁFICO MENSAL:\n"
-        f"{monthly_desc}\n"
-        "Responda em português, de forma clara, objetiva e profissional, com no máximo 20 linhas."
+    prompt = build_prompt(
+        SUMMARY_CHARTS_TEMPLATE,
+        fixed={"daily_desc": daily_desc, "monthly_desc": monthly_desc},
+        flexible={"news": lambda max_tokens: format_news(news_analysis, max_tokens)}
     )
-    if openai_api_key:
-        try:
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": "Você é um especialista em saúde pública, com foco em doenças respiratórias agudas graves (SRAG)."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 500,
-                    "temperature": 0.7
-                },
-                timeout=30
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                logger.error(f"OpenAI response error: {response.status_code} - {response.text}")
-        except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}")
+    content = get_client().chat(prompt, deadline=deadline)
+    if content is not None:
+        return content
     # fallback
+    news_summary = format_news(news_analysis, PROMPT_TOKEN_BUDGET)
     return (
         "Resumo de gráficos e notícias:\n"
         f"Notícias: {news_summary}\n"
         f"Gráficos: Diário: {daily_desc} | Mensal: {monthly_desc}"
     )
 
-def generate_executive_summary(summary_metrics, summary_charts):
+def generate_section_summaries(metrics, news_analysis, charts, deadline=None) -> Tuple[str, str]:
+    """
+    Generate the metrics and charts summaries at the same time.
+    They are independent, so the two LLM calls overlap instead of running back to back.
+    Returns (summary_metrics, summary_charts).
+    """
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary") as executor:
+        summary_metrics = executor.submit(generate_summary_metrics, metrics, news_analysis, deadline)
+        summary_charts = executor.submit(generate_summary_charts, news_analysis, charts, deadline)
+        return summary_metrics.result(), summary_charts.result()
+
+def generate_executive_summary(summary_metrics, summary_charts, deadline=None):
     """
     Generate a final executive summary using the two previous summaries.
-    Uses LLM if available, otherwise produces a simple summary.
+    Uses LLM if available (and the deadline allows), otherwise produces a simple summary.
     """
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    prompt = (
-        "Com base nos dois resumos abaixo (um sobre métricas e notícias, outro sobre análise de gráficos e notícias), escreva um resumo executivo final, comentando sobre o todo, destacando riscos e alertas para gestores públicos.\n"
-        "1. Destaque os principais pontos de atenção e tendências.\n"
-        "2. Comente sobre tendências dos gráficos.\n"
-        "3. Seja conciso, objetivo e profissional.\n"
-        "\nRESUMO MÉTRICAS/NOTÍCIAS:\n"
-        f"{summary_metrics}\n"
-        "RESUMO GRÁFICOS/NOTÍCIAS:\n"
-        f"{summary_charts}\n"
-        "Responda em português, em formato de texto corrido (sem tópicos ou listas), com no máximo 12 linhas."
+    prompt = build_prompt(
+        EXECUTIVE_SUMMARY_TEMPLATE,
+        fixed={},
+        flexible={
+            "summary_metrics": lambda max_tokens: truncate_to_tokens(summary_metrics, max_tokens),
+            "summary_charts": lambda max_tokens: truncate_to_tokens(summary_charts, max_tokens),
+        }
     )
-    if openai_api_key:
-        try:
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": "Você é um especialista em saúde pública, com foco em doenças respiratórias agudas graves (SRAG)."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 500,
-                    "temperature": 0.7
-                },
-                timeout=30
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                logger.error(f"OpenAI response error: {response.status_code} - {response.text}")
-        except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}")
+    content = get_client().chat(prompt, deadline=deadline)
+    if content is not None:
+        return content
     # fallback
     return (
         "Resumo executivo:\n"
@@ -186,8 +150,9 @@ def assemble_report(state):
         "charts": state.get("charts"),
     }
     # Generate summaries
-    summary_metrics = generate_summary_metrics(state.get("metrics"), state.get("news_analysis"))
-    summary_charts = generate_summary_charts(state.get("news_analysis"), state.get("charts"))
+    summary_metrics, summary_charts = generate_section_summaries(
+        state.get("metrics"), state.get("news_analysis"), state.get("charts")
+    )
     executive_summary = generate_executive_summary(summary_metrics, summary_charts)
     report["summary_metrics"] = summary_metrics
     report["summary_charts"] = summary_charts
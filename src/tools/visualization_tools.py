@@ -1,18 +1,58 @@
-import sqlite3
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+from src.data_loader import SQLITE_DB
+from src.utils.query_plan import register_query
+from src.utils.sqlite_reader import get_reader
+from src.tools.chart_renderer import render_charts
 
 logger = logging.getLogger(__name__)
 
+DAILY_CASES_QUERY = register_query("visualization.daily_cases", """
+    WITH MaxDate AS (
+        SELECT MAX(DT_SIN_PRI_DATETIME) as value FROM srag_daily
+    ),
+    EndDate AS (
+        SELECT DATE((SELECT value FROM MaxDate), 'start of month', '-1 day') as value
+    ),
+    StartDate AS (
+        SELECT DATE((SELECT value FROM EndDate), :days_interval) as value
+    )
+    SELECT
+        DATE(DT_SIN_PRI_DATETIME) as date,
+        SUM(cases) as cases
+    FROM srag_daily
+    WHERE DT_SIN_PRI_DATETIME BETWEEN (SELECT value FROM StartDate) AND (SELECT value FROM EndDate)
+    GROUP BY date
+    ORDER BY date;
+""", {"days_interval": "-29 days"})
+
+# Fetches all complete months; the last N are selected in pandas.
+MONTHLY_CASES_QUERY = register_query("visualization.monthly_cases", """
+    SELECT
+        STRFTIME('%Y-%m', DT_SIN_PRI_DATETIME) as month_year,
+        SUM(cases) as cases
+    FROM srag_daily
+    WHERE DT_SIN_PRI_DATETIME < DATE((SELECT MAX(DT_SIN_PRI_DATETIME) FROM srag_daily), 'start of month')
+    GROUP BY month_year
+    ORDER BY month_year;
+""")
+
+
 class VisualizationTool:
-    """Tool to generate charts and visualizations from data."""
+    """
+    Tool to generate charts and visualizations from data.
+
+    Each chart is turned into a spec (query results plus figure and style
+    settings) here; drawing and saving happen in chart_renderer, in worker
+    processes when several charts are rendered together.
+    """
 
-    def __init__(self, db_path: str = "src/database.db"):
+    def __init__(self, db_path: str = SQLITE_DB):
         self.db_path = db_path
+        self.reader = get_reader(db_path)
         self.output_dir = Path("resources/charts")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self._setup_style()
@@ -22,126 +62,112 @@ class VisualizationTool:
         self.sns_style = "darkgrid"
         self.sns_style_params = {"grid.color": ".5", "grid.linestyle": ":"}
         self.colors = ["#001F3F", "#AAAAAA", "#334C66", "#7099A8", "#D8D8D8"]
-        sns.set_style(self.sns_style, self.sns_style_params)
-        sns.set_palette(sns.color_palette(self.colors))
+
+    def _style(self) -> Dict[str, Any]:
+        return {"sns_style": self.sns_style, "sns_style_params": self.sns_style_params, "colors": self.colors}
 
     def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
         """
         Execute a parameterized SQL query and return a DataFrame.
         Using parameters prevents SQL Injection.
         """
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                df = pd.read_sql_query(query, conn, params=params)
-                logger.info(f"Query executed successfully. Returned {len(df)} rows.")
-                return df
-        except Exception as e:
-            logger.error(f"Error executing query: {e}")
-            return pd.DataFrame()
-
-    def _save_and_close_plot(self, fig, filename: str) -> Path:
-        """Save the chart figure and close it to free memory."""
-        output_path = self.output_dir / filename
-        plt.tight_layout()
-        fig.savefig(output_path)
-        plt.close(fig)
-        logger.info(f"Chart saved at: {output_path}")
-        return output_path
+        return self.reader.execute_query(query, params=params)
 
-    def create_daily_cases_chart(self, days: int = 30) -> Dict[str, Any]:
+    def _daily_cases_spec(self, days: int = 30) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
         """
-        Generate a daily cases chart for the N days preceding the last full month with data.
+        Query the daily cases for the N days preceding the last full month with data.
+        Returns the chart spec (None if there is not enough data) and the chart result.
         """
         logger.info(f"Starting daily cases chart for the last {days} days.")
 
-        query = """
-            WITH MaxDate AS (
-                SELECT MAX(DT_SIN_PRI_DATETIME) as value FROM srag_table
-            ),
-            EndDate AS (
-                SELECT DATE((SELECT value FROM MaxDate), 'start of month', '-1 day') as value
-            ),
-            StartDate AS (
-                SELECT DATE((SELECT value FROM EndDate), :days_interval) as value
-            )
-            SELECT
-                DATE(DT_SIN_PRI_DATETIME) as date,
-                COUNT(*) as cases
-            FROM srag_table
-            WHERE DT_SIN_PRI_DATETIME BETWEEN (SELECT value FROM StartDate) AND (SELECT value FROM EndDate)
-            GROUP BY date
-            ORDER BY date;
-        """
-
-
         params = {"days_interval": f"-{days - 1} days"}
-        df = self.execute_query(query, params=params)
+        df = self.execute_query(DAILY_CASES_QUERY, params=params)
 
         if df.empty or len(df) < 2:
             logger.warning("Insufficient data to generate daily cases chart.")
-            return {"error": "Insufficient data to generate chart."}
-
-        df['date'] = pd.to_datetime(df['date'])
-
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.bar(df['date'], df['cases'], color=self.colors[0], alpha=0.9, label='Casos Diários')
+            return None, {"error": "Insufficient data to generate chart."}
 
+        moving_average = None
         if len(df) >= 7:
-            df['media_movel'] = df['cases'].rolling(window=7, min_periods=1).mean()
-            ax.plot(df['date'], df['media_movel'], color='gray', linewidth=2, label='Média Móvel (7 dias)')
+            moving_average = df['cases'].rolling(window=7, min_periods=1).mean().tolist()
             logger.info("7-day moving average added.")
 
-        ax.set_xlabel("Data")
-        ax.set_ylabel("Número de Casos")
-        plt.xticks(rotation=45, ha='right')
-        ax.legend()
-        
-        output_path = self._save_and_close_plot(fig, "daily_cases.png")
-        
-        df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+        output_path = self.output_dir / "daily_cases.png"
+        spec = {
+            "kind": "daily_cases",
+            "figsize": (10, 5),
+            "style": self._style(),
+            "data": {"date": df['date'].tolist(), "cases": df['cases'].tolist(), "moving_average": moving_average},
+            "output_path": str(output_path),
+        }
+
+        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
         data_list = df[['date', 'cases']].to_dict(orient='records')
         description = (
             f"Casos diários dos {days} dias anteriores ao último mês completo.\n"
             f"Período de {data_list[0]['date']} a {data_list[-1]['date']}."
         )
 
-        return {"image_path": str(output_path), "data": data_list, "description": description}
-
+        return spec, {"image_path": str(output_path), "data": data_list, "description": description}
 
-    def create_monthly_cases_chart(self, months: int = 12) -> Dict[str, Any]:
+    def _monthly_cases_spec(self, months: int = 12) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
         """
-        Generate a monthly cases chart for the last N complete months.
+        Query the monthly cases for the last N complete months.
+        Returns the chart spec (None if there is not enough data) and the chart result.
         """
         logger.info(f"Starting monthly cases chart for the last {months} months.")
 
-        # Simplified query to fetch all complete months and then filter the last N
-        query = """
-            SELECT
-                STRFTIME('%Y-%m', DT_SIN_PRI_DATETIME) as month_year,
-                COUNT(*) as cases
-            FROM srag_table
-            WHERE DT_SIN_PRI_DATETIME < DATE((SELECT MAX(DT_SIN_PRI_DATETIME) FROM srag_table), 'start of month')
-            GROUP BY month_year
-            ORDER BY month_year;
-        """
-        df_all_months = self.execute_query(query)
+        df_all_months = self.execute_query(MONTHLY_CASES_QUERY)
 
         if df_all_months.empty or len(df_all_months) < 2:
             logger.warning("Insufficient data to generate monthly chart.")
-            return {"error": "Insufficient data (minimum 2 complete months)."}
+            return None, {"error": "Insufficient data (minimum 2 complete months)."}
 
         # Filter the last N months in pandas, which is simpler
         df = df_all_months.tail(months).copy()
-        
-        fig, ax = plt.subplots(figsize=(8, 4))
-        sns.barplot(x='month_year', y='cases', data=df, ax=ax, alpha=0.9, color=self.colors[0])
-        ax.set_xlabel("Ano-Mês")
-        ax.set_ylabel("Número de Casos")
-        plt.xticks(rotation=45, ha='right')
-
-        output_path = self._save_and_close_plot(fig, "monthly_cases.png")
 
+        output_path = self.output_dir / "monthly_cases.png"
         data_list = df.to_dict(orient='records')
+        spec = {
+            "kind": "monthly_cases",
+            "figsize": (8, 4),
+            "style": self._style(),
+            "data": data_list,
+            "output_path": str(output_path),
+        }
         description = f"Casos mensais para os últimos {len(df)} meses completos."
 
-        return {"image_path": str(output_path), "data": data_list, "description": description}
\ No newline at end of file
+        return spec, {"image_path": str(output_path), "data": data_list, "description": description}
+
+    def create_charts(self, days: int = 30, months: int = 12) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate the daily and monthly cases charts with render_charts.
+
+        Returns:
+            dict: daily_cases_chart and monthly_cases_chart, as returned by
+            create_daily_cases_chart and create_monthly_cases_chart.
+        """
+        charts = {
+            "daily_cases_chart": self._daily_cases_spec(days),
+            "monthly_cases_chart": self._monthly_cases_spec(months),
+        }
+        render_charts([spec for spec, _ in charts.values() if spec is not None])
+        return {name: result for name, (_, result) in charts.items()}
+
+    def create_daily_cases_chart(self, days: int = 30) -> Dict[str, Any]:
+        """
+        Generate a daily cases chart for the N days preceding the last full month with data.
+        """
+        spec, result = self._daily_cases_spec(days)
+        if spec is not None:
+            render_charts([spec])
+        return result
+
+    def create_monthly_cases_chart(self, months: int = 12) -> Dict[str, Any]:
+        """
+        Generate a monthly cases chart for the last N complete months.
+        """
+        spec, result = self._monthly_cases_spec(months)
+        if spec is not None:
+            render_charts([spec])
+        return result
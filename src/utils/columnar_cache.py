@@ -0,0 +1,120 @@
+import shutil
+import logging
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - the cache is optional
+    pa = ds = pafs = pq = None
+
+from .logs import setup_logging
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+COLUMNAR_DIR = PROJECT_ROOT / "data" / "columnar"
+# Files of a source being (re)loaded, moved into COLUMNAR_DIR once its load commits.
+STAGING_DIR = PROJECT_ROOT / "data" / "columnar-staging"
+PARTITION_KEY = "year"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def is_available() -> bool:
+    """Whether pyarrow is installed, which the columnar cache requires."""
+    return pq is not None
+
+
+def _source_stem(source_file: str) -> str:
+    return Path(source_file).stem
+
+
+def write_partitions(df: pd.DataFrame, source_file: str, part: int = 0,
+                     year_column: str = "ANO", cache_dir: Path = COLUMNAR_DIR):
+    """
+    Write a processed frame to the cache as Parquet, one file per year.
+
+    Files are laid out as `year=<ANO>/<source>-<part>.parquet`, so a source can be
+    replaced on its own and readers can skip whole years.
+    """
+    if not is_available() or df.empty:
+        return
+    years = df[year_column]
+    for year, group in df.groupby(years, dropna=False, sort=False):
+        partition = NULL_PARTITION if pd.isna(year) else str(int(year))
+        directory = Path(cache_dir) / f"{PARTITION_KEY}={partition}"
+        directory.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(group, preserve_index=False)
+        pq.write_table(table, directory / f"{_source_stem(source_file)}-{part:05d}.parquet")
+
+
+def remove_source(source_file: str, cache_dir: Path = COLUMNAR_DIR):
+    """Delete every cached file written for a source."""
+    for path in Path(cache_dir).glob(f"{PARTITION_KEY}=*/{_source_stem(source_file)}-*.parquet"):
+        path.unlink()
+
+
+def promote_source(source_file: str, staging_dir: Path = STAGING_DIR, cache_dir: Path = COLUMNAR_DIR):
+    """Replace a source's cached files with the ones staged for it, then remove emptied staging directories."""
+    remove_source(source_file, cache_dir)
+    for path in Path(staging_dir).glob(f"{PARTITION_KEY}=*/{_source_stem(source_file)}-*.parquet"):
+        target = Path(cache_dir) / path.parent.name / path.name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        path.replace(target)
+    _remove_empty_dirs(staging_dir)
+
+
+def _remove_empty_dirs(directory: Path):
+    """Delete a directory's empty partition directories, and the directory itself if nothing is left."""
+    directory = Path(directory)
+    for partition in directory.glob(f"{PARTITION_KEY}=*"):
+        if partition.is_dir() and not any(partition.iterdir()):
+            partition.rmdir()
+    if directory.is_dir() and not any(directory.iterdir()):
+        directory.rmdir()
+
+
+def clear(cache_dir: Path = COLUMNAR_DIR, staging_dir: Path = STAGING_DIR):
+    """Delete the whole cache, including anything staged."""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def has_source(source_file: str, cache_dir: Path = COLUMNAR_DIR) -> bool:
+    """Whether the cache holds any data for a source."""
+    return any(Path(cache_dir).glob(f"{PARTITION_KEY}=*/{_source_stem(source_file)}-*.parquet"))
+
+
+def has_data(cache_dir: Path = COLUMNAR_DIR) -> bool:
+    """Whether the cache can be read."""
+    return is_available() and any(Path(cache_dir).glob(f"{PARTITION_KEY}=*/*.parquet"))
+
+
+def read_columns(columns: List[str], years: Optional[Iterable[int]] = None,
+                 cache_dir: Path = COLUMNAR_DIR) -> pd.DataFrame:
+    """
+    Read only the requested columns from the cache, memory-mapping the files.
+
+    Args:
+        columns (List[str]): Columns to read; no other column is touched on disk.
+        years (Iterable[int], optional): Restrict the read to these year partitions.
+    Returns:
+        pd.DataFrame: The requested columns for every cached row.
+    """
+    if not has_data(cache_dir):
+        raise FileNotFoundError(f"No columnar cache found at {cache_dir}.")
+    dataset = ds.dataset(
+        str(cache_dir),
+        format="parquet",
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+        partitioning=ds.partitioning(pa.schema([(PARTITION_KEY, pa.int32())]), flavor="hive"),
+    )
+    row_filter = ds.field(PARTITION_KEY).isin(list(years)) if years is not None else None
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    return table.to_pandas()
@@ -0,0 +1,29 @@
+import time
+from typing import Optional
+
+# Work that would get less than this many seconds is skipped instead of started.
+MIN_BUDGET_SECONDS = 0.5
+
+
+def make_deadline(seconds: Optional[float]) -> Optional[float]:
+    """An absolute deadline (time.time() based) `seconds` from now, or None for no limit."""
+    return time.time() + seconds if seconds else None
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before the deadline (never negative), or None without a deadline."""
+    if deadline is None:
+        return None
+    return max(deadline - time.time(), 0.0)
+
+
+def is_exhausted(deadline: Optional[float]) -> bool:
+    """Whether too little time is left to start more work."""
+    left = remaining(deadline)
+    return left is not None and left < MIN_BUDGET_SECONDS
+
+
+def cap_timeout(timeout: float, deadline: Optional[float]) -> float:
+    """`timeout` reduced to the time left before the deadline."""
+    left = remaining(deadline)
+    return timeout if left is None else min(timeout, left)
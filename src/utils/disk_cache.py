@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .logs import setup_logging
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+CACHE_ROOT = PROJECT_ROOT / "data" / "cache"
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable key parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent cache of picklable values, one file per entry.
+
+    Entries are written atomically. Reading an entry refreshes its modification time,
+    and when the cache grows past `max_bytes` the least recently used entries are
+    deleted first. With a `ttl` (seconds), older entries count as misses.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, ttl: Optional[float] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pkl"
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """The cached value and its age in seconds, ignoring the TTL, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                created, value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        return value, time.time() - created
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """The cached value, or `default` if it is missing or older than the TTL."""
+        entry = self.get_entry(key)
+        if entry is None:
+            return default
+        value, age = entry
+        if self.ttl is not None and age > self.ttl:
+            return default
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value and evict old entries if the cache is over its size limit."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*/*.pkl"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def clear(self):
+        """Delete every entry."""
+        shutil.rmtree(self.directory, ignore_errors=True)
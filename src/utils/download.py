@@ -0,0 +1,253 @@
+import io
+import os
+import re
+import time
+import base64
+import hashlib
+import logging
+from typing import BinaryIO, Iterator, Optional
+
+import requests
+
+from .deadline import cap_timeout, is_exhausted, remaining
+from .logs import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_RETRIES = 3
+# S3 (and most object stores) send the hex MD5 of the content as the ETag of a
+# single-part upload; multipart and weak ETags do not match this pattern.
+MD5_ETAG = re.compile(r'"?([0-9a-fA-F]{32})"?')
+
+
+class ChecksumError(Exception):
+    """Raised when a downloaded file does not match its expected size or hash."""
+
+
+def server_md5(response: requests.Response) -> Optional[str]:
+    """
+    Hex MD5 of the whole file as stated by the server, or None.
+
+    Taken from Content-MD5 on a full (200) response, otherwise from an ETag that
+    is a plain MD5, as S3 sends for files uploaded in one part.
+    """
+    content_md5 = response.headers.get("Content-MD5")
+    if content_md5 and response.status_code == 200:
+        try:
+            return base64.b64decode(content_md5, validate=True).hex()
+        except ValueError:
+            logger.warning(f"Ignoring malformed Content-MD5 header from {response.url}.")
+    match = MD5_ETAG.fullmatch(response.headers.get("ETag", ""))
+    return match.group(1).lower() if match else None
+
+
+class DownloadStream(io.RawIOBase):
+    """
+    Readable binary stream over a URL that saves every byte it serves to disk.
+
+    Bytes go to `<dest>.part` as they are read, so a parser can consume the
+    download while it is still in progress. A `.part` file left by an earlier
+    attempt is served first and the rest is requested with a Range header;
+    dropped connections are resumed the same way. Once the last byte is read the
+    size is verified, along with the SHA-256 if one is given and the MD5 the
+    server states (Content-MD5 or an MD5 ETag) if there is one, and the file is
+    renamed to `dest`. A resumed request whose ETag differs from the first one
+    means the file changed mid-download, so the partial file is discarded.
+
+    With a `deadline` (a time.time() value), request timeouts are capped to the
+    time left and the download stops with TimeoutError once it is used up; the
+    `.part` file is kept, so a later run resumes from it.
+    """
+
+    def __init__(self, url: str, dest: str, expected_sha256: Optional[str] = None,
+                 session: Optional[requests.Session] = None,
+                 chunk_bytes: int = DOWNLOAD_CHUNK_BYTES, timeout: float = DOWNLOAD_TIMEOUT,
+                 retries: int = DOWNLOAD_RETRIES, deadline: Optional[float] = None):
+        super().__init__()
+        self.url = url
+        self.dest = dest
+        self.part_path = dest + ".part"
+        self.expected_sha256 = expected_sha256
+        self.session = session or requests.Session()
+        self.chunk_bytes = chunk_bytes
+        self.timeout = timeout
+        self.retries = retries
+        self.deadline = deadline
+
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        self._digest = hashlib.sha256()
+        self._md5 = hashlib.md5(usedforsecurity=False)
+        self._etag: Optional[str] = None
+        self._server_md5: Optional[str] = None
+        self._buffer = bytearray()
+        self._served = 0
+        self._total_size: Optional[int] = None
+        self._response: Optional[requests.Response] = None
+        self._network: Optional[Iterator[bytes]] = None
+        self._finished = False
+        self._started = time.time()
+
+        resume_from = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        if resume_from:
+            logger.info(f"Resuming download of {url} from byte {resume_from}.")
+        self._partial: Optional[BinaryIO] = open(self.part_path, 'rb') if resume_from else None
+        self._part_file = open(self.part_path, 'ab')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._finished:
+            self._fill()
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        del self._buffer[:n]
+        return n
+
+    def _fill(self):
+        """Append the next block, from the partial file first and then the network."""
+        if self._partial is not None:
+            block = self._partial.read(self.chunk_bytes)
+            if block:
+                self._accept(block)
+                return
+            self._partial.close()
+            self._partial = None
+
+        for attempt in range(self.retries + 1):
+            self._check_deadline()
+            try:
+                if self._network is None:
+                    self._connect()
+                block = next(self._network, b'')
+                break
+            except (requests.RequestException, ConnectionError) as e:
+                self._close_response()
+                left = remaining(self.deadline)
+                if attempt == self.retries or (left is not None and left < 2 ** attempt):
+                    raise
+                logger.warning(f"Download of {self.url} interrupted at byte {self._served}: {e}. Retrying...")
+                time.sleep(2 ** attempt)
+
+        if block:
+            self._part_file.write(block)
+            self._accept(block)
+        else:
+            self._complete()
+
+    def _check_deadline(self):
+        """Raise TimeoutError once the deadline leaves no time for another request or read."""
+        if is_exhausted(self.deadline):
+            raise TimeoutError(f"Download of {self.url} stopped at byte {self._served}: pipeline deadline reached.")
+
+    def _accept(self, block: bytes):
+        self._digest.update(block)
+        self._md5.update(block)
+        self._buffer += block
+        self._served += len(block)
+
+    def _connect(self):
+        """Request the bytes after the ones already served."""
+        headers = {"Range": f"bytes={self._served}-"} if self._served else {}
+        response = self.session.get(self.url, headers=headers, stream=True,
+                                    timeout=cap_timeout(self.timeout, self.deadline))
+        self._response = response
+        if response.status_code == 416 and self._served:
+            # The partial file already holds every byte.
+            total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+            self._total_size = int(total) if total.isdigit() else None
+            self._network = iter(())
+            return
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        if etag:
+            if self._etag is not None and etag != self._etag:
+                self._discard(f"{self.url} changed during the download (ETag {self._etag} -> {etag}).")
+            self._etag = etag
+        self._server_md5 = self._server_md5 or server_md5(response)
+
+        if response.status_code == 206:
+            content_range = response.headers.get("Content-Range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            self._total_size = int(total) if total.isdigit() else None
+            skip = 0
+        else:
+            length = response.headers.get("Content-Length")
+            self._total_size = int(length) if length else None
+            # The server ignored the Range header: drop the bytes we already have.
+            skip = self._served
+        self._network = self._iter_body(response, skip)
+
+    def _iter_body(self, response: requests.Response, skip: int) -> Iterator[bytes]:
+        for block in response.iter_content(chunk_size=self.chunk_bytes):
+            if skip:
+                dropped = min(skip, len(block))
+                block = block[dropped:]
+                skip -= dropped
+            if block:
+                yield block
+
+    def _close_response(self):
+        if self._response is not None:
+            self._response.close()
+        self._response = None
+        self._network = None
+
+    def _discard(self, message: str):
+        """Delete the partial file and raise ChecksumError."""
+        self._finished = True
+        self._close_response()
+        if self._partial is not None:
+            self._partial.close()
+            self._partial = None
+        self._part_file.close()
+        os.remove(self.part_path)
+        raise ChecksumError(message)
+
+    def _complete(self):
+        """Verify the finished download and move it into place."""
+        self._finished = True
+        self._close_response()
+        self._part_file.close()
+
+        if self._total_size is not None and self._served != self._total_size:
+            self._discard(f"{self.url}: expected {self._total_size} bytes, got {self._served}.")
+        sha256 = self._digest.hexdigest()
+        if self.expected_sha256 and sha256 != self.expected_sha256.lower():
+            self._discard(f"{self.url}: SHA-256 {sha256} does not match {self.expected_sha256}.")
+        md5 = self._md5.hexdigest()
+        if self._server_md5 and md5 != self._server_md5:
+            self._discard(f"{self.url}: MD5 {md5} does not match the {self._server_md5} stated by the server.")
+        if not (self.expected_sha256 or self._server_md5):
+            logger.warning(f"{self.url}: no checksum available; only the size was verified.")
+
+        os.replace(self.part_path, self.dest)
+        elapsed = time.time() - self._started
+        logger.info(f"Downloaded {self._served / 1e6:.1f} MB to {self.dest} in {elapsed:.2f}s")
+
+    def close(self):
+        if not self.closed:
+            self._close_response()
+            if self._partial is not None:
+                self._partial.close()
+            self._part_file.close()
+        super().close()
+
+
+def open_source(url: str, dest: str, expected_sha256: Optional[str] = None,
+                session: Optional[requests.Session] = None, deadline: Optional[float] = None) -> BinaryIO:
+    """
+    Open a remote file for parsing, preferring a complete local copy at `dest`.
+
+    Without a local copy, the returned stream downloads to `dest` while it is read,
+    until `deadline` if one is given.
+    """
+    if os.path.isfile(dest):
+        logger.info(f"Using local copy {dest} for {url}.")
+        return open(dest, 'rb')
+    logger.info(f"Downloading {url} to {dest} while parsing...")
+    return io.BufferedReader(DownloadStream(url, dest, expected_sha256, session, deadline=deadline), buffer_size=DOWNLOAD_CHUNK_BYTES)
@@ -0,0 +1,129 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .deadline import cap_timeout, is_exhausted
+from .disk_cache import CACHE_ROOT, DiskCache, make_key
+from .logs import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Any OpenAI-compatible server can be used, e.g. a local stand-in.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_CHAT_URL = f"{OPENAI_BASE_URL.rstrip('/')}/chat/completions"
+LLM_MODEL = "gpt-4o-mini"
+LLM_MAX_TOKENS = 500
+LLM_TEMPERATURE = 0.7
+LLM_TIMEOUT = 30
+LLM_POOL_SIZE = 4
+# Use temperature 0 for every call, so identical inputs give reproducible summaries.
+LLM_DETERMINISTIC = os.getenv("LLM_DETERMINISTIC", "0") == "1"
+
+# Replies are cached by a hash of the endpoint and the full request body (model,
+# parameters and messages). LLM_CACHE_TTL=0 keeps entries until they are evicted.
+LLM_CACHE = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_DIR = CACHE_ROOT / "llm"
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "32"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "0")) or None
+
+SYSTEM_PROMPT = "Você é um especialista em saúde pública, com foco em doenças respiratórias agudas graves (SRAG)."
+
+
+class LLMClient:
+    """
+    Chat completion client over one keep-alive HTTP session.
+
+    The session keeps a small connection pool, so consecutive and concurrent
+    calls reuse TLS connections instead of opening a new one per request.
+    Successful replies are stored in a persistent cache keyed by the request
+    content, so an identical request is answered without a network round-trip.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, cache: Optional[DiskCache] = None):
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        if cache is None and LLM_CACHE:
+            cache = DiskCache(LLM_CACHE_DIR, LLM_CACHE_MAX_MB * 1024 * 1024, ttl=LLM_CACHE_TTL)
+        self.cache = cache
+
+    def chat(self, prompt: str, system: str = SYSTEM_PROMPT, model: str = LLM_MODEL,
+             max_tokens: int = LLM_MAX_TOKENS, temperature: float = LLM_TEMPERATURE,
+             timeout: float = LLM_TIMEOUT, deadline: Optional[float] = None) -> Optional[str]:
+        """
+        Send a system and a user message and return the reply text.
+
+        The request timeout is capped to the time left before `deadline`.
+        Returns None if OPENAI_API_KEY is not set, the request fails or the
+        deadline leaves no time for a request.
+        """
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            return None
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0 if LLM_DETERMINISTIC else temperature
+        }
+        key = make_key(OPENAI_CHAT_URL, payload)
+        if self.cache is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                logger.info("LLM reply served from cache.")
+                return content
+        if is_exhausted(deadline):
+            logger.warning("No time left before the pipeline deadline; skipping LLM call.")
+            return None
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                OPENAI_CHAT_URL,
+                headers={
+                    "Authorization": f"Bearer {openai_api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=payload,
+                timeout=cap_timeout(timeout, deadline)
+            )
+            if response.status_code != 200:
+                logger.error(f"OpenAI response error: {response.status_code} - {response.text}")
+                return None
+            result = response.json()
+            content = result["choices"][0]["message"]["content"].strip()
+        except Exception as e:
+            logger.error(f"Error calling OpenAI API: {e}")
+            return None
+        logger.info(f"LLM reply received in {time.perf_counter() - start:.2f}s")
+        if self.cache is not None:
+            try:
+                self.cache.set(key, content)
+            except OSError as e:
+                logger.warning(f"Could not cache LLM reply: {e}")
+        return content
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """The shared LLM client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
@@ -1,20 +1,187 @@
+import os
+import atexit
 import asyncio
 import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
+from typing import List, Optional
 from playwright.async_api import async_playwright
 from .logs import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-async def generate_pdf(html_path, pdf_path):
-    html_path = Path(html_path).resolve()
-    pdf_path = Path(pdf_path).resolve()
-    url = f"file://{html_path}"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-        await page.goto(url)
-        await page.pdf(path=str(pdf_path), format="A4", print_background=True)
-        await browser.close()
-    logger.info(f"PDF saved at: {pdf_path}")
\ No newline at end of file
+# Pages kept open in the shared browser; also the number of PDFs rendered at once.
+PDF_PAGE_POOL_SIZE = int(os.getenv("PDF_PAGE_POOL_SIZE", "2"))
+
+
+class PDFRenderer:
+    """
+    Long-lived HTML-to-PDF renderer over one headless Chromium.
+
+    The browser and a small pool of pages live on an event loop in a background
+    thread, so browser startup is paid once per process and jobs from any thread
+    (sync or async) run concurrently, up to the pool size. If Chromium crashes
+    or disconnects, it is relaunched on the next job and the interrupted job is
+    retried once. close() shuts everything down; it also runs at interpreter exit.
+    """
+
+    def __init__(self, pool_size: int = PDF_PAGE_POOL_SIZE):
+        self.pool_size = max(pool_size, 1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._playwright = None
+        self._browser = None
+        self._idle_pages: List = []
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="pdf-renderer", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _on_disconnected(self, browser):
+        if browser is self._browser:
+            logger.warning("Chromium disconnected; it will be relaunched for the next PDF.")
+            self._browser = None
+            self._idle_pages.clear()
+
+    async def _ensure_browser(self):
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            self._idle_pages.clear()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            try:
+                browser = await self._playwright.chromium.launch()
+            except Exception:
+                # The driver itself may be gone; start a fresh one next time.
+                await self._stop_playwright()
+                raise
+            browser.on("disconnected", self._on_disconnected)
+            self._browser = browser
+            logger.info("Chromium launched for PDF rendering.")
+            return browser
+
+    async def _stop_playwright(self):
+        playwright, self._playwright = self._playwright, None
+        if playwright is not None:
+            try:
+                await playwright.stop()
+            except Exception as e:
+                logger.warning(f"Error stopping Playwright: {e}")
+
+    async def _render_once(self, url: str, pdf_path: Path):
+        browser = await self._ensure_browser()
+        page = self._idle_pages.pop() if self._idle_pages else await browser.new_page()
+        try:
+            await page.goto(url)
+            await page.pdf(path=str(pdf_path), format="A4", print_background=True)
+        except BaseException:
+            # A page in an unknown state (crashed, mid-navigation) is not reused.
+            if not page.is_closed():
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            raise
+        if browser is self._browser:
+            self._idle_pages.append(page)
+        else:
+            await page.close()
+
+    async def _render(self, html_path, pdf_path):
+        html_path = Path(html_path).resolve()
+        pdf_path = Path(pdf_path).resolve()
+        url = f"file://{html_path}"
+        await self._ensure_browser()
+        async with self._slots:
+            try:
+                await self._render_once(url, pdf_path)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._browser is not None and self._browser.is_connected():
+                    raise
+                logger.warning(f"Chromium lost while rendering {pdf_path.name} ({e}); retrying once.")
+                await self._render_once(url, pdf_path)
+        logger.info(f"PDF saved at: {pdf_path}")
+
+    def render(self, html_path, pdf_path, timeout: Optional[float] = None):
+        """
+        Render an HTML file to an A4 PDF, blocking until it is saved.
+        With a timeout (seconds), the job is cancelled and TimeoutError is raised once it is exceeded.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._render(html_path, pdf_path), self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def render_async(self, html_path, pdf_path):
+        """Awaitable render(), usable from any event loop."""
+        future = asyncio.run_coroutine_threadsafe(self._render(html_path, pdf_path), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    async def _shutdown(self):
+        browser, self._browser = self._browser, None
+        self._idle_pages.clear()
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing Chromium: {e}")
+        await self._stop_playwright()
+
+    def close(self, timeout: float = 10):
+        """Close the browser and stop the renderer thread. A later render starts them again."""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"PDF renderer did not shut down cleanly: {e}")
+        self._launch_lock = self._slots = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
+_renderer: Optional[PDFRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> PDFRenderer:
+    """The shared PDF renderer, closed at interpreter exit."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PDFRenderer()
+            atexit.register(_renderer.close)
+        return _renderer
+
+
+async def generate_pdf(html_path, pdf_path, timeout: Optional[float] = None):
+    """
+    Render an HTML file to an A4 PDF with the shared headless Chromium.
+    With a timeout (seconds), the whole rendering raises asyncio.TimeoutError once it is exceeded.
+    """
+    if timeout is not None:
+        return await asyncio.wait_for(generate_pdf(html_path, pdf_path), timeout)
+    await get_renderer().render_async(html_path, pdf_path)
@@ -0,0 +1,156 @@
+import os
+import json
+import math
+import logging
+import unicodedata
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - token counts fall back to an estimate
+    tiktoken = None
+
+from .llm_client import LLM_MODEL
+from .logs import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Maximum tokens in the user prompt of each LLM call.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+# Maximum tokens of each article snippet in the news section.
+NEWS_ITEM_MAX_TOKENS = 60
+# Roughly four characters per token for Portuguese and JSON text without tiktoken.
+CHARS_PER_TOKEN = 4
+FLOAT_DECIMALS = 2
+
+# Articles mentioning more of these words are included first.
+RELEVANCE_KEYWORDS = [
+    "srag", "sindrome respiratoria", "influenza", "covid", "gripe", "virus",
+    "internacao", "internacoes", "uti", "obito", "obitos", "mortes", "casos", "vacina",
+]
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = LLM_MODEL) -> int:
+    """Number of tokens in `text`, exact with tiktoken and estimated without it."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = LLM_MODEL) -> str:
+    """Cut `text` to at most `max_tokens` tokens, marking the cut with an ellipsis."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens - 1]).rstrip() + "…"
+    return text[:(max_tokens - 1) * CHARS_PER_TOKEN].rstrip() + "…"
+
+
+def _round_floats(value: Any, decimals: int) -> Any:
+    if isinstance(value, float):
+        return round(value, decimals)
+    if isinstance(value, dict):
+        return {key: _round_floats(item, decimals) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round_floats(item, decimals) for item in value]
+    return value
+
+
+def compact_json(data: Any, decimals: int = FLOAT_DECIMALS) -> str:
+    """JSON without indentation or spaces, with floats rounded to `decimals` places."""
+    return json.dumps(_round_floats(data, decimals), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def rank_articles(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Articles ordered by how many relevance keywords they mention, keeping search order on ties."""
+    def score(article):
+        text = _normalize(f"{article.get('title') or ''} {article.get('summary') or ''}")
+        return sum(keyword in text for keyword in RELEVANCE_KEYWORDS)
+    return sorted(articles, key=score, reverse=True)
+
+
+def format_news(news_analysis: Optional[Dict[str, Any]], max_tokens: int) -> str:
+    """
+    The news section of a prompt, within `max_tokens`.
+
+    Uses the analysis summary if there is one; otherwise lists the most relevant
+    articles, one line each with a shortened snippet, while they fit.
+    """
+    if not news_analysis:
+        return ""
+    if news_analysis.get("summary"):
+        return truncate_to_tokens(news_analysis["summary"], max_tokens)
+    articles = news_analysis.get("articles") or []
+    lines = []
+    used = 0
+    for article in rank_articles(articles):
+        snippet = truncate_to_tokens(article.get("summary") or "", NEWS_ITEM_MAX_TOKENS)
+        line = f"- {article.get('title')} ({article.get('source')}, {article.get('date')}): {snippet}"
+        tokens = count_tokens(line) + 1
+        if used + tokens > max_tokens:
+            break
+        lines.append(line)
+        used += tokens
+    if len(lines) < len(articles):
+        logger.info(f"News section keeps {len(lines)} of {len(articles)} articles to fit {max_tokens} tokens.")
+    return "\n".join(lines) or "Nenhuma notícia analisada"
+
+
+def _fill(template: str, fixed: Dict[str, str], flexible: Dict[str, Callable[[int], str]], room: int) -> str:
+    """Fill `template` with values that take at most about `room` tokens in total."""
+    fixed_tokens = {name: count_tokens(value) for name, value in fixed.items()}
+    total = sum(fixed_tokens.values())
+    if total > room:
+        # The fixed values alone do not fit: each is cut to its proportional share.
+        logger.warning(f"Fixed prompt values take {total} tokens; truncating them to {room}.")
+        fixed = {name: truncate_to_tokens(value, room * fixed_tokens[name] // total)
+                 for name, value in fixed.items()}
+        total = sum(count_tokens(value) for value in fixed.values())
+    share = max(room - total, 0) // max(len(flexible), 1)
+    values = {name: render(share) for name, render in flexible.items()}
+    return template.format(**fixed, **values)
+
+
+def build_prompt(template: str, fixed: Dict[str, str], flexible: Dict[str, Callable[[int], str]],
+                 budget: int = PROMPT_TOKEN_BUDGET, attempts: int = 3) -> str:
+    """
+    Fill `template` (a str.format template) within a token budget.
+
+    `fixed` values are inserted as they are while they fit, and truncated to fit
+    otherwise. Each `flexible` value is rendered by a function that receives its
+    share of the tokens left by the rest of the prompt. Since the tokens of the
+    filled prompt can differ slightly from the sum of its parts, any overflow is
+    taken off the room for the values and the prompt is filled again.
+    """
+    base = template.format(**{name: "" for name in [*fixed, *flexible]})
+    room = max(budget - count_tokens(base), 0)
+    for _ in range(attempts):
+        prompt = _fill(template, fixed, flexible, room)
+        tokens = count_tokens(prompt)
+        if tokens <= budget or room == 0:
+            break
+        room = max(room - (tokens - budget), 0)
+    level = logging.WARNING if tokens > budget else logging.INFO
+    logger.log(level, f"Prompt has {tokens} tokens (budget {budget}).")
+    return prompt
@@ -0,0 +1,44 @@
+import sqlite3
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from .logs import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Queries the tools run against the database, with sample parameters for EXPLAIN.
+REGISTERED_QUERIES: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+
+def register_query(name: str, query: str, sample_params: Optional[Dict[str, Any]] = None) -> str:
+    """Register a query for plan checks and return it unchanged."""
+    REGISTERED_QUERIES[name] = (query, sample_params or {})
+    return query
+
+
+def log_query_plans(db_path: str) -> Dict[str, list]:
+    """
+    Log the EXPLAIN QUERY PLAN of every registered query.
+
+    Steps that scan a table without an index are logged as warnings.
+
+    Returns:
+        dict: The plan detail lines for each query name.
+    """
+    plans = {}
+    with sqlite3.connect(db_path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name, (query, params) in REGISTERED_QUERIES.items():
+            try:
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Could not explain query '{name}': {e}")
+                continue
+            details = [row[-1] for row in rows]
+            plans[name] = details
+            full_scans = [d for d in details
+                          if d.startswith("SCAN ") and d.split()[1] in tables and "INDEX" not in d]
+            level = logging.WARNING if full_scans else logging.INFO
+            logger.log(level, f"Query plan for '{name}': {' | '.join(details)}")
+    return plans
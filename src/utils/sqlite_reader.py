@@ -0,0 +1,132 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from urllib.parse import quote
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from src.data_loader import SQLITE_DB
+from .disk_cache import CACHE_ROOT, DiskCache, make_key
+from .logs import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Read connection settings
+READ_MMAP_BYTES = 256 * 1024 * 1024
+READ_CACHE_KIB = 64 * 1024
+STATEMENT_CACHE_SIZE = 128
+
+# Persistent query result cache
+QUERY_CACHE = os.getenv("SRAG_QUERY_CACHE", "1") == "1"
+QUERY_CACHE_DIR = CACHE_ROOT / "queries"
+QUERY_CACHE_MAX_MB = int(os.getenv("SRAG_QUERY_CACHE_MAX_MB", "64"))
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace and drop the trailing semicolon so formatting does not change the key."""
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+def database_fingerprint(db_path: str) -> str:
+    """
+    Size and modification time of the database file (and its WAL, if any).
+
+    Every write by the loader changes it, so cached results of an older version of
+    the data are never served.
+    """
+    parts = []
+    for path in (db_path, db_path + "-wal"):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+    return "/".join(parts)
+
+
+class SQLiteReader:
+    """
+    Read-only access to a SQLite database, shared by the tools.
+
+    Each thread gets one connection opened with `mode=ro`, memory-mapped I/O and a
+    larger page cache, and keeps it for every later query, so connection setup,
+    page-cache warmup and statement preparation are paid once per thread.
+
+    Results are also kept in a persistent cache keyed by the normalized SQL, the
+    parameters and the database fingerprint, so a rerun against unchanged data does
+    not touch the database at all.
+    """
+
+    def __init__(self, db_path: str = SQLITE_DB, cache: Optional[DiskCache] = None):
+        self.db_path = str(Path(db_path).resolve())
+        self._local = threading.local()
+        if cache is None and QUERY_CACHE:
+            cache = DiskCache(QUERY_CACHE_DIR, QUERY_CACHE_MAX_MB * 1024 * 1024)
+        self.cache = cache
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"file:{quote(Path(self.db_path).as_posix())}?mode=ro",
+                uri=True,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            conn.execute(f"PRAGMA mmap_size = {READ_MMAP_BYTES}")
+            conn.execute(f"PRAGMA cache_size = -{READ_CACHE_KIB}")
+            self._local.conn = conn
+        return conn
+
+    def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Execute a (parameterized) SQL query and return a DataFrame.
+        Returns an empty DataFrame if the query fails.
+        """
+        start = time.perf_counter()
+        key = None
+        if self.cache is not None:
+            key = make_key(self.db_path, database_fingerprint(self.db_path), normalize_sql(query), params)
+            df = self.cache.get(key)
+            if df is not None:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                logger.info(f"Query served from cache. Returned {len(df)} rows in {elapsed_ms:.1f} ms.")
+                return df
+        try:
+            df = pd.read_sql_query(query, self.connection(), params=params)
+        except Exception as e:
+            logger.error(f"Error executing query: {e}")
+            self.close()
+            return pd.DataFrame()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Query executed successfully. Returned {len(df)} rows in {elapsed_ms:.1f} ms.")
+        if key is not None:
+            try:
+                self.cache.set(key, df)
+            except OSError as e:
+                logger.warning(f"Could not cache query result: {e}")
+        return df
+
+    def close(self):
+        """Close the calling thread's connection; the next query reopens it."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_readers: Dict[str, SQLiteReader] = {}
+_readers_lock = threading.Lock()
+
+
+def get_reader(db_path: str = SQLITE_DB) -> SQLiteReader:
+    """The shared reader for a database file."""
+    key = str(Path(db_path).resolve())
+    with _readers_lock:
+        if key not in _readers:
+            _readers[key] = SQLiteReader(key)
+        return _readers[key]
@@ -0,0 +1,22 @@
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+# Modules the fork server imports once, so the workers forked from it start
+# without importing them again. The server is shared by every process pool and
+# starts with the first one, so it preloads what all of them need.
+FORKSERVER_PRELOAD = ["src.data_loader", "src.tools.chart_renderer", "matplotlib.pyplot", "seaborn"]
+
+
+def get_worker_context() -> BaseContext:
+    """
+    Multiprocessing context for the process pools.
+
+    Workers fork from a fork server instead of from this process, which may already
+    run other threads (graph nodes, news requests, logging) whose locks a plain fork
+    would copy in a held state. Falls back to spawn where forkserver is unavailable.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        return context
+    return multiprocessing.get_context("spawn")
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+from src.data_loader import PROJECT_ROOT
+
+# Streams a CSV into a fresh database in a new interpreter and prints its peak RSS in KiB.
+STREAM_AND_MEASURE = """
+import resource, sys
+from src import data_loader
+data_loader.COLUMNAR_CACHE = False
+data_loader.stream_csv_to_sqlite(sys.argv[1], True, sys.argv[2], data_loader.TABLE_NAME,
+                                 chunksize=20000, memory_limit_mb=16)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def _write_csv(path, rows: int):
+    with open(path, "w", encoding="latin1") as f:
+        f.write("DT_SIN_PRI;EVOLUCAO;UTI;VACINA_COV;VACINA;CLASSI_FIN;SEM_PRI\n")
+        for i in range(rows):
+            f.write(f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d};{i % 3 + 1};{i % 2 + 1};1;2;5;{i % 52 + 1}\n")
+
+
+def _peak_rss_mb(tmp_path, rows: int) -> float:
+    csv_path = tmp_path / f"INFLUD-{rows}.csv"
+    _write_csv(csv_path, rows)
+    result = subprocess.run(
+        [sys.executable, "-c", STREAM_AND_MEASURE, str(csv_path), str(tmp_path / f"srag-{rows}.db")],
+        cwd=PROJECT_ROOT, env={**os.environ, "PYTHONPATH": PROJECT_ROOT},
+        capture_output=True, text=True, check=True,
+    )
+    return int(result.stdout.split()[-1]) / 1024
+
+
+def test_stream_memory_does_not_grow_with_input(tmp_path):
+    # The page cache holding the source's uncommitted pages is part of the ceiling,
+    # so eight times the rows must not need noticeably more memory.
+    small = _peak_rss_mb(tmp_path, 40000)
+    large = _peak_rss_mb(tmp_path, 320000)
+    assert large - small < 10, f"peak RSS grew from {small:.0f} MB to {large:.0f} MB"
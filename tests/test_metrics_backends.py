@@ -0,0 +1,138 @@
+import pandas as pd
+import pytest
+
+from src import data_loader
+from src.data_loader import (
+    SOURCE_COLUMN, TABLE_NAME, aggregate_rollups, bulk_connection, bulk_insert,
+    process_dataframe, write_rollups,
+)
+from src.tools import metrics_backends
+from src.tools.metrics_backends import get_backend
+from src.tools.metrics_tools import MetricsTool
+from src.utils import columnar_cache, sqlite_reader
+
+SOURCE = "INFLUD-TEST.csv"
+
+# (DT_SIN_PRI, EVOLUCAO, UTI, VACINA_COV, number of rows). March 2024 is missing,
+# April 2024 has cases but no deaths, ICU or vaccinated cases, and the last two
+# groups have no usable date.
+ROWS = [
+    ("2023-12-30", 2, 1, 1, 3),
+    ("2024-01-05", 1, 2, 1, 4),
+    ("2024-01-20", 2, 9, 2, 2),
+    ("2024-02-10", None, 1, None, 5),
+    ("2024-02-11", 3, 2, 1, 1),
+    ("2024-04-02", 1, 2, 2, 6),
+    ("2024-05-15", 2, 1, 1, 2),
+    ("2024-05-31", 9, 9, 9, 1),
+    (None, 2, 1, 1, 2),
+    ("not-a-date", 1, 2, 9, 1),
+]
+
+
+def _raw_frame() -> pd.DataFrame:
+    records = []
+    for date, evolucao, uti, vacina_cov, count in ROWS:
+        records += [{
+            "DT_SIN_PRI": date, "EVOLUCAO": evolucao, "UTI": uti, "VACINA_COV": vacina_cov,
+            "VACINA": 9, "CLASSI_FIN": 5, "SEM_PRI": 1,
+        }] * count
+    return pd.DataFrame(records).astype(data_loader.CSV_READ_OPTIONS["dtype"])
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A database with srag_table, its rollups and a columnar cache, all from ROWS."""
+    monkeypatch.setattr(sqlite_reader, "QUERY_CACHE", False)
+    db_path = str(tmp_path / "srag.db")
+    cache_dir = tmp_path / "columnar"
+
+    df = process_dataframe(_raw_frame())
+    df[SOURCE_COLUMN] = SOURCE
+    with bulk_connection(db_path) as conn:
+        bulk_insert(conn, df, TABLE_NAME)
+        write_rollups(conn, SOURCE, aggregate_rollups(df))
+    columnar_cache.write_partitions(df, SOURCE, cache_dir=cache_dir)
+    return db_path, cache_dir
+
+
+@pytest.fixture
+def columnar_database(database, monkeypatch):
+    """The same database, set up as the one the NumPy backend reads from the columnar cache."""
+    db_path, cache_dir = database
+    has_data, read_columns = columnar_cache.has_data, columnar_cache.read_columns
+    reads = []
+
+    def read_cached_columns(columns, cache_dir=cache_dir):
+        reads.append(columns)
+        return read_columns(columns, cache_dir=cache_dir)
+
+    monkeypatch.setattr(metrics_backends, "SQLITE_DB", db_path)
+    monkeypatch.setattr(columnar_cache, "has_data", lambda cache_dir=cache_dir: has_data(cache_dir))
+    monkeypatch.setattr(columnar_cache, "read_columns", read_cached_columns)
+    return db_path, reads
+
+
+def _expected_totals() -> pd.DataFrame:
+    df = process_dataframe(_raw_frame())
+    totals = pd.DataFrame({
+        "year": df["ANO"].astype("Float64"),
+        "month": df["MES"].astype("Float64"),
+        "total_cases": 1,
+        "total_deaths": (df["EVOLUCAO"] == 2).astype(int),
+        "total_uti_cases": (df["UTI"] == 1).astype(int),
+        "total_vaccinated": (df["VACINA_COV"] == 1).astype(int),
+    }).groupby(["year", "month"], dropna=False, as_index=False).sum()
+    # Most recent month first, undated rows last.
+    return totals.sort_values(["year", "month"], ascending=False, na_position="last").reset_index(drop=True)
+
+
+def _normalized(totals: pd.DataFrame) -> pd.DataFrame:
+    totals = totals.reset_index(drop=True).astype("float64")
+    return totals[["year", "month"] + metrics_backends.TOTAL_COLUMNS]
+
+
+def test_sql_backend_matches_row_counts(database):
+    db_path, _ = database
+    totals = get_backend("sql", db_path).monthly_totals()
+    pd.testing.assert_frame_equal(_normalized(totals), _normalized(_expected_totals()))
+
+
+@pytest.mark.parametrize("source", ["table", "columnar"])
+def test_numpy_backend_matches_sql_backend(request, database, source):
+    if source == "columnar":
+        db_path, reads = request.getfixturevalue("columnar_database")
+    else:
+        (db_path, _), reads = database, None
+    sql_totals = get_backend("sql", db_path).monthly_totals()
+    numpy_totals = get_backend("numpy", db_path).monthly_totals()
+    if reads is not None:
+        assert reads, "the NumPy backend did not read the columnar cache"
+
+    assert sql_totals["year"].isna().iloc[-1]
+    assert not ((sql_totals["year"] == 2024) & (sql_totals["month"] == 3)).any()
+    assert (sql_totals.loc[(sql_totals["year"] == 2024) & (sql_totals["month"] == 4), "total_deaths"] == 0).all()
+    pd.testing.assert_frame_equal(_normalized(numpy_totals), _normalized(sql_totals))
+
+
+def test_all_month_metrics_agree_across_backends(columnar_database):
+    db_path, _ = columnar_database
+    sql_metrics = MetricsTool(db_path, backend="sql").get_all_month_metrics()
+    numpy_metrics = MetricsTool(db_path, backend="numpy").get_all_month_metrics()
+    assert numpy_metrics == sql_metrics
+    # May 2024 is the latest (incomplete) month; April 2024 is compared with February.
+    assert sql_metrics["case_increase_rate"]["compared_month"] == (2024, 2)
+    assert sql_metrics["mortality_rate"]["mortality_rate"] == 0.0
+
+
+def test_metric_series_covers_every_calendar_month(database):
+    db_path, _ = database
+    series = MetricsTool(db_path, backend="sql").get_metric_series(rolling_window=2)
+    assert list(zip(series["year"], series["month"])) == [
+        (2023, 12), (2024, 1), (2024, 2), (2024, 3), (2024, 4), (2024, 5),
+    ]
+    march, april = series.iloc[3], series.iloc[4]
+    assert march["total_cases"] == 0 and march["is_complete"]
+    # April's change and rolling window are over adjacent months, not February.
+    assert pd.isna(april["case_increase_rate"])
+    assert april["total_cases_rolling_2"] == 6
@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.tools import news_search_tools
+from src.tools.news_search_tools import SEARCH_TERMS, NewsSearchTool
+
+LATENCY = 0.3
+
+
+class SlowSerper:
+    """Stand-in for the Serper session that answers every request after LATENCY seconds."""
+
+    def __init__(self, articles_per_term: int):
+        self.articles_per_term = articles_per_term
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def post(self, url, headers, data, timeout):
+        term = json.loads(data)["q"]
+        with self._lock:
+            self.queries.append(term)
+        time.sleep(LATENCY)
+        return SlowResponse([{"title": term, "link": f"{term}/{i}"} for i in range(self.articles_per_term)])
+
+
+class SlowResponse:
+    status_code = 200
+
+    def __init__(self, news):
+        self.news = news
+
+    def json(self):
+        return {"news": self.news}
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    monkeypatch.setattr(news_search_tools, "NEWS_CACHE_TTL", 0)
+
+
+def _timed_search(session):
+    start = time.monotonic()
+    news = NewsSearchTool(session=session).search_srag_news(max_results=5)
+    return news, time.monotonic() - start
+
+
+def test_first_wave_answers_in_about_one_request():
+    session = SlowSerper(articles_per_term=10)
+    news, elapsed = _timed_search(session)
+    assert [item["url"] for item in news] == [f"{SEARCH_TERMS[0]}/{i}" for i in range(5)]
+    assert len(session.queries) < len(SEARCH_TERMS)
+    assert elapsed < 1.5 * LATENCY
+
+
+def test_short_first_wave_sends_remaining_terms_at_once():
+    session = SlowSerper(articles_per_term=0)
+    news, elapsed = _timed_search(session)
+    assert news == []
+    assert sorted(session.queries) == sorted(SEARCH_TERMS)
+    # One round trip for the first wave and one for all the other terms together.
+    assert elapsed < 2.5 * LATENCY
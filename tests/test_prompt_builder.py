@@ -0,0 +1,29 @@
+from src.tools.report_summary_tools import SUMMARY_METRICS_TEMPLATE
+from src.utils.prompt_builder import build_prompt, compact_json, count_tokens, truncate_to_tokens
+
+BUDGET = 400
+
+
+def test_oversized_metrics_are_cut_to_the_budget():
+    metrics = {f"month_{i}": {"total_cases": i * 1000, "mortality_rate": i / 7} for i in range(500)}
+    assert count_tokens(compact_json(metrics)) > BUDGET
+    prompt = build_prompt(
+        SUMMARY_METRICS_TEMPLATE,
+        fixed={"metrics": compact_json(metrics)},
+        flexible={"news": lambda max_tokens: truncate_to_tokens("notícia " * 1000, max_tokens)},
+        budget=BUDGET,
+    )
+    assert count_tokens(prompt) <= BUDGET
+    assert "MÉTRICAS:\n{\"month_0\"" in prompt
+
+
+def test_fixed_values_that_fit_are_kept_whole():
+    metrics = compact_json({"mortality_rate": 12.3456})
+    prompt = build_prompt(
+        SUMMARY_METRICS_TEMPLATE,
+        fixed={"metrics": metrics},
+        flexible={"news": lambda max_tokens: "notícia"},
+        budget=BUDGET,
+    )
+    assert '{"mortality_rate":12.35}' in prompt
+    assert count_tokens(prompt) <= BUDGET